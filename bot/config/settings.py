@@ -48,8 +48,48 @@ class Settings:
         default_config = {
             'ollama': {
                 'base_url': 'http://localhost:11434',
+                'base_urls': [],  # several Ollama servers, e.g. ['http://10.0.0.2:11434', 'http://10.0.0.3:11434']
+                'endpoints': {
+                    'strategy': 'least_outstanding',  # or 'latency'
+                    'failure_threshold': 2,
+                    'recheck_seconds': 30
+                },
                 'model': 'llama2',
-                'temperature': 0.7
+                'temperature': 0.7,
+                'pool_size': 4,
+                'connect_timeout': 5,
+                'read_timeout': 60,
+                'max_in_flight': 2,
+                'warm_up': True,
+                'keep_alive': '30m',
+                'coalesce_window_seconds': 300,
+                'structured_output': True,  # JSON cold emails; 'schema' for Ollama >= 0.5, False for plain text
+                'generation_profiles': {},  # e.g. {'cold_email': {'num_predict': 400, 'coalesce': False}}
+                'cache': {
+                    'enabled': True,
+                    'path': 'logs/llm_cache.sqlite3',
+                    'ttl_seconds': 604800,  # 7 days
+                    'max_entries': 5000,
+                    'bypass_temperature': 0.9
+                },
+                'retry': {
+                    'max_attempts': 3,
+                    'base_delay': 1.0,
+                    'max_delay': 30,
+                    'retry_read_timeouts': False,  # a hanging model falls back instead of retrying
+                    'deadline_seconds': 180,  # per generation, across retries and fallback models
+                    'task_deadlines': {}  # e.g. {'x_post': 60}
+                },
+                'recovery_probe_interval': 60,
+                'metrics_log': 'logs/ollama_metrics.jsonl',  # per-run metrics, aggregated by --report
+                'router': {
+                    'failure_threshold': 3,
+                    'error_rate_threshold': 0.5,
+                    'cooldown_seconds': 120,
+                    'prefer_fastest': True,
+                    'model_tiers': {},
+                    'min_quality_tier': 0
+                }
             },
             
             'user_profile': {
@@ -100,7 +140,28 @@ class Settings:
                 'google_contacts_csv': '',
                 'additional_recipient_csvs': [],
                 'daily_email_limit': 50,
-                'delay_between_emails': 60,  # seconds
+                'delay_between_emails': 60,  # seconds between sends once the burst is used
+                'email_burst': 1,
+                'hourly_email_limit': 0,  # 0 = no hourly cap
+                'prepare_ahead': 2,  # emails built in the background while waiting to send
+                'parallel_campaign': True,  # in full mode, send alongside the other platforms
+                'campaign_id': 'default',  # recipients already sent in this campaign are skipped
+                'outbox': {
+                    'enabled': True,
+                    'path': 'logs/email_outbox.sqlite3',
+                    'max_attempts': 3
+                },
+                'recontact_after_days': 30,  # skip recipients emailed this recently (0 disables)
+                'sent_history': {
+                    'path': 'logs/sent_history.sqlite3',
+                    'batch_size': 20,
+                    'csv_mirror': True  # also append sends to logs/sent_emails.csv
+                },
+                'smtp': {
+                    'max_messages_per_connection': 50,
+                    'noop_after_idle_seconds': 30,  # check idle connections before reusing them
+                    'timeout': 30
+                },
                 'my_name': 'Your Name',
                 'my_title': 'Software Developer',
                 'my_phone': '+1234567890',
@@ -109,14 +170,26 @@ class Settings:
                 'my_skills': 'Python, React, Node.js, AWS',
                 'my_experience': '3+ years building web applications',
                 'message_subject': '',
-                'message_body': '',
+                'message_body': '',  # {name}/{company} filled locally, [[...]] rewritten by AI
                 'personalize_custom_message': True,
                 'use_multi_model': False,
                 'multi_models': [],
+                'multi_model_deadline_seconds': 90,
+                'multi_model_first_k': 0,  # 0 waits for every model
+                'multi_model_min_score': 6,
+                'cluster_generation': False,  # one AI draft per company/position/tags group
+                'cluster_min_recipients': 200,
                 'attachment_paths': [],
                 'resume_path': '',
                 'auto_attach_resume': True,
-                'target_tags': []
+                'attachment_cache_mb': 50,  # encoded attachments kept in memory across emails
+                'target_tags': [],
+                'exclude_tags': [],
+                'tag_expression': '',  # e.g. '(python or go) and not intern', ANDed with target_tags
+                'recipient_cache': {
+                    'enabled': True,  # memory-mapped compiled copies of the recipient CSVs
+                    'path': 'logs/recipient_cache'
+                }
             },
             
             'x_twitter': {
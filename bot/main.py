@@ -6,6 +6,7 @@ Automates job applications and outreach across multiple platforms
 
 import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -20,10 +21,15 @@ from config.settings import Settings
 class JobAutomationBot:
     """Main bot controller orchestrating all automation tasks"""
     
-    def __init__(self, config_path: str = "config/config.yaml"):
+    def __init__(self, config_path: str = "config/config.yaml", warm_up: bool = True):
         self.setup_logging()
         self.settings = Settings(config_path)
         self.ai = OllamaAI(self.settings.ollama_config)
+
+        # Load models before the first request of the campaign needs them
+        if warm_up and self.settings.ollama_config.get('warm_up', True):
+            self.ai.warm_up()
+            self.ai.check_model_availability()
         
         # Initialize platform bots
         self.linkedin = LinkedInBot(self.settings.linkedin_config, self.ai)
@@ -63,11 +69,11 @@ class JobAutomationBot:
             self.logger.error(f"LinkedIn outreach failed: {e}")
             raise
     
-    def run_gmail_campaign(self, recipient_list: list = None):
+    def run_gmail_campaign(self, recipient_list: list = None, resume: bool = False):
         """Send cold emails via Gmail"""
-        self.logger.info("Starting Gmail cold email campaign")
+        self.logger.info("Resuming Gmail cold email campaign" if resume else "Starting Gmail cold email campaign")
         try:
-            results = self.gmail.send_cold_emails(recipient_list)
+            results = self.gmail.send_cold_emails(recipient_list, resume=resume)
             self.logger.info(f"Gmail campaign completed: {results}")
             return results
         except Exception as e:
@@ -116,29 +122,55 @@ class JobAutomationBot:
             'errors': {}
         }
 
-        for key, runner in [
+        tasks = [
             ('linkedin', self.run_linkedin_outreach),
             ('gmail', self.run_gmail_campaign),
             ('x', self.run_x_engagement),
             ('job_platforms', self.run_job_applications),
-        ]:
+        ]
+
+        # Paced email sends mostly wait, so they run alongside the other platforms
+        background = {}
+        executor = None
+        if self.settings.gmail_config.get('parallel_campaign', True):
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gmail-campaign')
+            background['gmail'] = executor.submit(self.run_gmail_campaign)
+            tasks = [(key, runner) for key, runner in tasks if key not in background]
+
+        for key, runner in tasks:
             try:
                 results[key] = runner()
             except Exception as e:
                 self.logger.error(f"{key} task failed: {e}")
                 results['errors'][key] = str(e)
 
+        for key, future in background.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                self.logger.error(f"{key} task failed: {e}")
+                results['errors'][key] = str(e)
+        if executor:
+            executor.shutdown()
+
         self.logger.info("Full campaign completed")
         return results
     
     def generate_daily_report(self):
-        """Generate and save daily activity report"""
+        """Generate and save daily activity report
+
+        AI metrics are aggregated from every run logged since midnight, as
+        reports are usually generated in a separate process.
+        """
+        midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         report = {
             'date': datetime.now().strftime('%Y-%m-%d'),
             'linkedin_connections': self.linkedin.get_stats(),
             'emails_sent': self.gmail.get_stats(),
             'x_posts': self.x_bot.get_stats(),
-            'applications': self.job_platforms.get_stats()
+            'applications': self.job_platforms.get_stats(),
+            'ai': self.ai.get_stats(),
+            'ai_metrics': self.ai.get_metrics_since(midnight.timestamp())
         }
         
         report_path = Path(__file__).resolve().parent / "logs" / f"report_{report['date']}.json"
@@ -148,6 +180,10 @@ class JobAutomationBot:
         
         self.logger.info(f"Daily report saved to {report_path}")
         return report
+    
+    def close(self):
+        """Release shared resources such as pooled AI connections"""
+        self.ai.close()
 
 
 def main():
@@ -158,25 +194,32 @@ def main():
                         help='Path to configuration file')
     parser.add_argument('--report', action='store_true',
                         help='Generate daily report')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the last unfinished email campaign from the outbox')
     
     args = parser.parse_args()
     
-    bot = JobAutomationBot(args.config)
-    
-    if args.report:
-        bot.generate_daily_report()
-        return
+    bot = JobAutomationBot(args.config, warm_up=not args.report)
     
-    if args.mode == 'full':
-        bot.run_full_campaign()
-    elif args.mode == 'linkedin':
-        bot.run_linkedin_outreach()
-    elif args.mode == 'gmail':
-        bot.run_gmail_campaign()
-    elif args.mode == 'x':
-        bot.run_x_engagement()
-    elif args.mode == 'jobs':
-        bot.run_job_applications()
+    try:
+        if args.report:
+            bot.generate_daily_report()
+            return
+        
+        if args.resume:
+            bot.run_gmail_campaign(resume=True)
+        elif args.mode == 'full':
+            bot.run_full_campaign()
+        elif args.mode == 'linkedin':
+            bot.run_linkedin_outreach()
+        elif args.mode == 'gmail':
+            bot.run_gmail_campaign()
+        elif args.mode == 'x':
+            bot.run_x_engagement()
+        elif args.mode == 'jobs':
+            bot.run_job_applications()
+    finally:
+        bot.close()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Job Automation Bot - Modules Package
 """
 
 from .ollama_ai import OllamaAI
+from .async_ollama_ai import AsyncOllamaAI
 from .linkedin_bot import LinkedInBot
 from .gmail_bot import GmailBot
 from .x_bot import XBot
@@ -10,6 +11,7 @@ from .job_platform_bot import JobPlatformBot
 
 __all__ = [
     'OllamaAI',
+    'AsyncOllamaAI',
     'LinkedInBot',
     'GmailBot',
     'XBot',
@@ -0,0 +1,132 @@
+"""
+Async Ollama AI Integration
+Asyncio front-end for OllamaAI with bounded concurrent generations
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from .ollama_ai import OllamaAI
+
+
+class AsyncOllamaAI:
+    """Asyncio interface for Ollama local AI models
+
+    Generations run on the pooled HTTP session of a wrapped OllamaAI in a
+    dedicated worker pool, so prompts and response parsing stay identical to
+    the synchronous client. At most ``max_in_flight`` requests are sent to
+    the Ollama server at once; size it to match ``OLLAMA_NUM_PARALLEL``.
+    """
+
+    def __init__(self, config: Dict, ai_engine: Optional[OllamaAI] = None):
+        self.ai = ai_engine or OllamaAI(config)
+        self.owns_engine = ai_engine is None
+        self.max_in_flight = max(1, int(config.get('max_in_flight', 2)))
+        self.logger = logging.getLogger(__name__)
+
+        # Never hold more sockets busy than the HTTP pool can keep alive
+        if self.ai.pool_size < self.max_in_flight:
+            self.logger.warning(
+                f"max_in_flight ({self.max_in_flight}) exceeds pool_size ({self.ai.pool_size}); "
+                "extra connections will not be reused"
+            )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix='ollama',
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.logger.info(f"Initialized async Ollama client (max_in_flight={self.max_in_flight})")
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking OllamaAI call without blocking the event loop"""
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(func, *args, **kwargs),
+            )
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: Optional[float] = None,
+        task: Optional[str] = None,
+    ) -> str:
+        """Generate text using Ollama API"""
+        return await self._run(self.ai._generate, prompt, system_prompt, temperature, task=task)
+
+    async def generate_linkedin_message(self, recipient_info: Dict) -> str:
+        """Generate personalized LinkedIn connection message"""
+        return await self._run(self.ai.generate_linkedin_message, recipient_info)
+
+    async def generate_linkedin_follow_up(self, context: str) -> str:
+        """Generate follow-up message for LinkedIn"""
+        return await self._run(self.ai.generate_linkedin_follow_up, context)
+
+    async def generate_cold_email(self, recipient_info: Dict) -> Dict[str, str]:
+        """Generate cold email subject and body"""
+        return await self._run(self.ai.generate_cold_email, recipient_info)
+
+    async def generate_cold_email_candidates(
+        self,
+        recipient_info: Dict,
+        models: Optional[List[str]] = None,
+        temperature: Optional[float] = None,
+        deadline_seconds: Optional[float] = None,
+        first_k: Optional[int] = None,
+        accept: Optional[Callable[[Dict[str, str]], bool]] = None,
+    ) -> List[Dict[str, str]]:
+        """Generate multiple cold email candidates across models."""
+        return await self._run(
+            self.ai.generate_cold_email_candidates,
+            recipient_info,
+            models=models,
+            temperature=temperature,
+            deadline_seconds=deadline_seconds,
+            first_k=first_k,
+            accept=accept,
+        )
+
+    async def generate_x_post(self, topic: str = "job search") -> str:
+        """Generate engaging X (Twitter) post about job search"""
+        return await self._run(self.ai.generate_x_post, topic)
+
+    async def generate_cover_letter(self, job_info: Dict, max_chars: Optional[int] = None) -> str:
+        """Generate tailored cover letter for job application"""
+        return await self._run(self.ai.generate_cover_letter, job_info, max_chars)
+
+    async def personalize_template(self, template: str, variables: Dict) -> str:
+        """Use AI to personalize a template with provided variables"""
+        return await self._run(self.ai.personalize_template, template, variables)
+
+    async def improve_text(self, text: str, context: str = "professional message") -> str:
+        """Improve existing text for better clarity and professionalism"""
+        return await self._run(self.ai.improve_text, text, context)
+
+    async def check_model_availability(self) -> bool:
+        """Check if Ollama is running and model is available"""
+        return await self._run(self.ai.check_model_availability)
+
+    async def close(self):
+        """Shut down the worker pool and the wrapped client if we own it"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        if self.owns_engine:
+            self.ai.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
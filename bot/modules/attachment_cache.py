@@ -0,0 +1,108 @@
+"""
+Attachment Cache
+Reads and base64-encodes each attachment once per campaign instead of once per email
+"""
+
+import base64
+import logging
+import os
+import threading
+from collections import OrderedDict
+from email.mime.base import MIMEBase
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class AttachmentCache:
+    """Encoded attachment payloads keyed by (path, size, mtime).
+
+    Any change to a file's size or mtime re-reads it. Payloads are kept
+    up to ``max_bytes`` of encoded data, least recently used first out.
+    Directory listings are cached by the directory's own mtime, which
+    changes whenever a file is added, removed or renamed in it.
+    """
+
+    def __init__(self, max_bytes: int = 50 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'hits': 0,
+            'misses': 0
+        }
+
+        self._lock = threading.Lock()
+        self._payloads: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+        self._size = 0
+        self._listings: Dict[str, Tuple[int, Optional[Path]]] = {}
+
+    @staticmethod
+    def _encode(data: bytes) -> str:
+        """Base64 in 76-character lines, as email.encoders.encode_base64 produces"""
+        return base64.encodebytes(data).decode('ascii')
+
+    def get_part(self, path: Path) -> MIMEBase:
+        """Return a ready-to-attach MIME part for a file; raises OSError if unreadable"""
+        path = Path(path)
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+                self.stats['hits'] += 1
+
+        if payload is None:
+            with open(path, 'rb') as file:
+                payload = self._encode(file.read())
+            self._store(key, payload)
+
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(payload)
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', f'attachment; filename="{path.name}"')
+        return part
+
+    def _store(self, key: Tuple[str, int, int], payload: str):
+        with self._lock:
+            self.stats['misses'] += 1
+            if len(payload) > self.max_bytes:
+                return
+
+            # Drop stale versions of the same file before adding the new one
+            for stale in [cached for cached in self._payloads if cached[0] == key[0]]:
+                self._size -= len(self._payloads.pop(stale))
+
+            self._payloads[key] = payload
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self._size -= len(evicted)
+
+    def latest_file(self, directory: Path) -> Optional[Path]:
+        """Most recently modified file in a directory, re-scanned only when it changes"""
+        directory = Path(directory)
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+        cache_key = str(directory)
+        with self._lock:
+            cached = self._listings.get(cache_key)
+        if cached and cached[0] == dir_mtime:
+            return cached[1]
+
+        candidates = [path for path in directory.iterdir() if path.is_file()]
+        latest = max(candidates, key=lambda p: p.stat().st_mtime) if candidates else None
+        with self._lock:
+            self._listings[cache_key] = (dir_mtime, latest)
+        return latest
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'entries': len(self._payloads),
+                'bytes': self._size
+            }
@@ -0,0 +1,197 @@
+"""
+Email Outbox
+Persistent SQLite record of every campaign message and its delivery state
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .recipient import Recipient
+
+
+class EmailOutbox:
+    """Campaign messages keyed by hash(campaign_id, email).
+
+    Each message moves through ``queued`` -> ``rendered`` -> ``sending``
+    -> ``sent`` or ``failed``. Rendered subject/body are stored so a resumed
+    run sends exactly what was generated before instead of generating
+    again, and a key that reached ``sent`` is never sent twice. A message
+    still ``sending`` was interrupted mid-send and may have been delivered,
+    so it is never retried automatically; ``needs_review`` lists them.
+    """
+
+    QUEUED = 'queued'
+    RENDERED = 'rendered'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    def __init__(self, config: Dict):
+        bot_dir = Path(__file__).resolve().parent.parent
+        self.path = Path(config.get('path') or 'logs/email_outbox.sqlite3').expanduser()
+        if not self.path.is_absolute():
+            self.path = bot_dir / self.path
+        self.max_attempts = int(config.get('max_attempts', 3))
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS messages (
+                key TEXT PRIMARY KEY,
+                campaign_id TEXT NOT NULL,
+                email TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                content TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )'''
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_messages_campaign_state ON messages (campaign_id, state)'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(campaign_id: str, email: str) -> str:
+        """Idempotency key for one recipient within a campaign"""
+        material = f"{campaign_id}\n{email.strip().lower()}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _dump_recipient(recipient: Dict) -> str:
+        data = recipient.to_dict() if isinstance(recipient, Recipient) else dict(recipient)
+        return json.dumps(data, default=str)
+
+    def _row_to_entry(self, row) -> Dict:
+        key, recipient, content, state, attempts = row
+        return {
+            'key': key,
+            'recipient': json.loads(recipient),
+            'content': json.loads(content) if content else None,
+            'state': state,
+            'attempts': attempts
+        }
+
+    def is_pending(self, entry: Dict) -> bool:
+        """True while a message still needs sending"""
+        if entry['state'] == self.FAILED:
+            return entry['attempts'] < self.max_attempts
+        return entry['state'] not in (self.SENDING, self.SENT)
+
+    def _fetch(self, keys: List[str]) -> Dict[str, Dict]:
+        entries = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                'SELECT key, recipient, content, state, attempts FROM messages '
+                f'WHERE key IN ({",".join("?" * len(chunk))})',
+                chunk,
+            ).fetchall()
+            entries.update((row[0], self._row_to_entry(row)) for row in rows)
+        return entries
+
+    def lookup(self, campaign_id: str, recipients: List[Dict]) -> List[Optional[Dict]]:
+        """Existing entries for recipients in this campaign (None if never queued)"""
+        keys = [self.make_key(campaign_id, recipient.get('email', '')) for recipient in recipients]
+        with self._lock:
+            entries = self._fetch(keys)
+        return [entries.get(key) for key in keys]
+
+    def enqueue(self, campaign_id: str, recipients: List[Dict]) -> List[Dict]:
+        """Queue recipients not seen in this campaign; return every entry in input order"""
+        now = time.time()
+        keys = [self.make_key(campaign_id, recipient.get('email', '')) for recipient in recipients]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO messages '
+                '(key, campaign_id, email, recipient, state, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (key, campaign_id, recipient.get('email', ''), self._dump_recipient(recipient),
+                     self.QUEUED, now, now)
+                    for key, recipient in zip(keys, recipients)
+                ],
+            )
+            self._conn.commit()
+            entries = self._fetch(keys)
+
+        return [entries[key] for key in keys]
+
+    def pending(self, campaign_id: str) -> List[Dict]:
+        """Entries still to send, in the order they were queued"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, recipient, content, state, attempts FROM messages '
+                'WHERE campaign_id = ? AND (state IN (?, ?) OR (state = ? AND attempts < ?)) '
+                'ORDER BY rowid',
+                (campaign_id, self.QUEUED, self.RENDERED, self.FAILED, self.max_attempts),
+            ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def latest_unfinished_campaign(self) -> Optional[str]:
+        """The most recently active campaign that still has messages to send"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT campaign_id FROM messages '
+                'WHERE state IN (?, ?) OR (state = ? AND attempts < ?) '
+                'ORDER BY updated_at DESC LIMIT 1',
+                (self.QUEUED, self.RENDERED, self.FAILED, self.max_attempts),
+            ).fetchone()
+        return row[0] if row else None
+
+    def needs_review(self, campaign_id: Optional[str] = None) -> List[Dict]:
+        """Messages interrupted between starting and confirming a send"""
+        query = 'SELECT key, recipient, content, state, attempts FROM messages WHERE state = ?'
+        params: tuple = (self.SENDING,)
+        if campaign_id is not None:
+            query += ' AND campaign_id = ?'
+            params += (campaign_id,)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY rowid', params).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def _update(self, key: str, sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(f'UPDATE messages SET {sql}, updated_at = ? WHERE key = ?', (*params, time.time(), key))
+            self._conn.commit()
+
+    def mark_rendered(self, key: str, content: Dict[str, str]):
+        self._update(key, 'state = ?, content = ?', (self.RENDERED, json.dumps(content)))
+
+    def mark_sending(self, key: str):
+        """Record that a send is starting, before the message is handed to SMTP"""
+        self._update(key, 'state = ?', (self.SENDING,))
+
+    def mark_sent(self, key: str):
+        self._update(key, 'state = ?, attempts = attempts + 1, error = NULL', (self.SENT,))
+
+    def mark_failed(self, key: str, error: str):
+        self._update(key, 'state = ?, attempts = attempts + 1, error = ?', (self.FAILED, error[:500]))
+
+    def get_stats(self, campaign_id: Optional[str] = None) -> Dict[str, int]:
+        """Message counts per state, for one campaign or all of them"""
+        query = 'SELECT state, COUNT(*) FROM messages'
+        params: tuple = ()
+        if campaign_id is not None:
+            query += ' WHERE campaign_id = ?'
+            params = (campaign_id,)
+        with self._lock:
+            rows = self._conn.execute(query + ' GROUP BY state', params).fetchall()
+        return {state: count for state, count in rows}
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,179 @@
+"""
+Ollama Endpoint Pool
+Spreads requests over several Ollama servers and drains unhealthy ones
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class _Endpoint:
+    """Load and health bookkeeping for one Ollama server"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.drained_at = 0.0
+        self.requests = 0
+        self.failures = 0
+
+
+class EndpointPool:
+    """Picks the Ollama endpoint for each request.
+
+    ``least_outstanding`` sends each request to the endpoint with the fewest
+    requests in flight; ``latency`` weighs in-flight requests by each
+    endpoint's moving-average latency. After ``failure_threshold``
+    consecutive transport failures an endpoint is drained, and it is
+    health-checked again lazily once ``recheck_seconds`` have passed.
+    """
+
+    STRATEGIES = ('least_outstanding', 'latency')
+
+    def __init__(self, urls: List[str], config: Dict, health_check: Optional[Callable[[str], bool]] = None):
+        if not urls:
+            raise ValueError("At least one Ollama endpoint is required")
+
+        self.strategy = config.get('strategy', 'least_outstanding')
+        if self.strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown endpoint strategy: {self.strategy}")
+        self.failure_threshold = int(config.get('failure_threshold', 2))
+        self.recheck_seconds = float(config.get('recheck_seconds', 30))
+        self.ewma_alpha = float(config.get('ewma_alpha', 0.3))
+        self.health_check = health_check
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._endpoints = [_Endpoint(url.rstrip('/')) for url in urls]
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self._endpoints]
+
+    def _find(self, url: str) -> Optional[_Endpoint]:
+        for endpoint in self._endpoints:
+            if endpoint.url == url:
+                return endpoint
+        return None
+
+    def _load(self, endpoint: _Endpoint) -> float:
+        if self.strategy == 'latency' and endpoint.ewma_latency is not None:
+            return (endpoint.outstanding + 1) * endpoint.ewma_latency
+        return endpoint.outstanding
+
+    def _recheck_due(self) -> List[str]:
+        """Claim drained endpoints whose re-check time has come"""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for endpoint in self._endpoints:
+                if not endpoint.healthy and now - endpoint.drained_at >= self.recheck_seconds:
+                    # Push the next attempt out so concurrent callers don't all probe
+                    endpoint.drained_at = now
+                    due.append(endpoint.url)
+        return due
+
+    def acquire(self, exclude: Optional[List[str]] = None) -> str:
+        """Reserve the least-loaded healthy endpoint and return its URL
+
+        Endpoints in ``exclude`` (e.g. ones that just failed this request)
+        are skipped unless nothing else is left.
+        """
+        if self.health_check and len(self._endpoints) > 1:
+            for url in self._recheck_due():
+                if self.health_check(url):
+                    self.mark_healthy(url)
+
+        with self._lock:
+            pool = [endpoint for endpoint in self._endpoints if endpoint.url not in (exclude or [])]
+            pool = pool or self._endpoints
+            candidates = [endpoint for endpoint in pool if endpoint.healthy]
+            if not candidates:
+                # Everything is drained: keep trying the one drained longest ago
+                candidates = [min(pool, key=lambda endpoint: endpoint.drained_at)]
+
+            endpoint = min(
+                enumerate(candidates),
+                key=lambda item: (self._load(item[1]), item[0]),
+            )[1]
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint.url
+
+    def release(self, url: str, latency: Optional[float] = None, ok: bool = True):
+        """Return an endpoint reserved by acquire() and record the outcome"""
+        with self._lock:
+            endpoint = self._find(url)
+            if endpoint is None:
+                return
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+
+            if ok:
+                endpoint.consecutive_failures = 0
+                if latency is not None:
+                    if endpoint.ewma_latency is None:
+                        endpoint.ewma_latency = latency
+                    else:
+                        endpoint.ewma_latency += self.ewma_alpha * (latency - endpoint.ewma_latency)
+                return
+
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.healthy and endpoint.consecutive_failures >= self.failure_threshold:
+                self._drain(endpoint, f"{endpoint.consecutive_failures} consecutive failures")
+
+    def _drain(self, endpoint: _Endpoint, reason: str):
+        endpoint.healthy = False
+        endpoint.drained_at = time.monotonic()
+        if len(self._endpoints) > 1:
+            self.logger.warning(
+                f"Draining Ollama endpoint {endpoint.url} for {self.recheck_seconds:.0f}s ({reason})"
+            )
+
+    def mark_unhealthy(self, url: str):
+        with self._lock:
+            endpoint = self._find(url)
+            if endpoint is not None and endpoint.healthy:
+                self._drain(endpoint, "failed health check")
+
+    def mark_healthy(self, url: str):
+        with self._lock:
+            endpoint = self._find(url)
+            if endpoint is not None and not endpoint.healthy:
+                endpoint.healthy = True
+                endpoint.consecutive_failures = 0
+                self.logger.info(f"Ollama endpoint {url} is back in rotation")
+
+    def check_all(self) -> Dict[str, bool]:
+        """Health-check every endpoint now, draining or restoring each one"""
+        results = {}
+        for url in self.urls:
+            healthy = bool(self.health_check(url)) if self.health_check else True
+            if healthy:
+                self.mark_healthy(url)
+            else:
+                self.mark_unhealthy(url)
+            results[url] = healthy
+        return results
+
+    def get_stats(self) -> Dict:
+        """Return per-endpoint health, load and latency"""
+        with self._lock:
+            return {
+                endpoint.url: {
+                    'healthy': endpoint.healthy,
+                    'outstanding': endpoint.outstanding,
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures,
+                    'ewma_latency': round(endpoint.ewma_latency, 3) if endpoint.ewma_latency is not None else None
+                }
+                for endpoint in self._endpoints
+            }
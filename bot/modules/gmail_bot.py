@@ -5,15 +5,29 @@ Handles cold email campaigns for job outreach
 
 import logging
 import smtplib
-import time
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import csv
 from pathlib import Path
 
+from .attachment_cache import AttachmentCache
+from .email_outbox import EmailOutbox
+from .recipient import ColumnLoader, Recipient, recipients_from_rows
+from .recipient_cache import RecipientCache
+from .send_scheduler import DAY, HOUR, SendScheduler
+from .sent_history import SentHistory
+from .smtp_session import SMTPSession
+from .tag_index import TagIndex, TagQuery, parse_tag_expression
+from .template_engine import render_template
+
+# Merged recipients keep the fields the bot reads; other columns are not carried over
+MERGE_FIELDS = ('email', 'name', 'company', 'position_type', 'source', 'tags')
+MERGE_BATCH = 1000
+
 
 class GmailBot:
     """Automates cold email campaigns via Gmail"""
@@ -25,6 +39,9 @@ class GmailBot:
         self.log_dir = Path(__file__).resolve().parent.parent / 'logs'
         self.uploads_dir = Path(__file__).resolve().parent.parent / 'uploads'
         self.ai_enabled = True
+        self.attachments = AttachmentCache(int(self.config.get('attachment_cache_mb', 50)) * 1024 * 1024)
+        cache_config = self.config.get('recipient_cache', {}) or {}
+        self.recipient_cache = RecipientCache(cache_config) if cache_config.get('enabled', True) else None
         self.stats = {
             'emails_sent': 0,
             'emails_failed': 0
@@ -34,17 +51,15 @@ class GmailBot:
         self.smtp_server = "smtp.gmail.com"
         self.smtp_port = 587
     
-    def _connect_smtp(self):
-        """Connect to Gmail SMTP server"""
-        try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.config['email'], self.config['app_password'])
-            self.logger.info("Connected to Gmail SMTP")
-            return server
-        except Exception as e:
-            self.logger.error(f"SMTP connection failed: {e}")
-            raise
+    def _create_smtp_session(self) -> SMTPSession:
+        """Gmail SMTP session that connects on first send and survives idle drops"""
+        return SMTPSession(
+            self.smtp_server,
+            self.smtp_port,
+            self.config['email'],
+            self.config['app_password'],
+            self.config.get('smtp', {}) or {},
+        )
     
     def _normalize_tags(self, tags: object) -> List[str]:
         if isinstance(tags, list):
@@ -53,21 +68,6 @@ class GmailBot:
             return [tag.strip() for tag in tags.split(',') if tag.strip()]
         return []
 
-    def _matches_tags(self, tags: List[str], target_tags: List[str], mode: str) -> bool:
-        if not target_tags or mode == 'keywords':
-            return True
-
-        tags_lower = {tag.lower() for tag in tags if tag}
-        target_lower = {tag.lower() for tag in target_tags if tag}
-
-        if not tags_lower:
-            return False
-
-        if mode == 'all':
-            return target_lower.issubset(tags_lower)
-
-        return bool(tags_lower & target_lower)
-
     def _extract_email(self, row: Dict) -> str:
         direct = row.get('email') or row.get('Email') or row.get('E-mail')
         if direct:
@@ -81,81 +81,150 @@ class GmailBot:
                 return str(value).strip()
         return ""
 
-    def _load_recipients_from_csv(self, csv_file: str, source: str) -> List[Dict]:
-        recipients: List[Dict] = []
+    def _process_csv_row(self, row: Dict, source: str) -> Optional[Dict]:
+        """Normalize one CSV row into a recipient, or None if it has no email"""
+        email = self._extract_email(row)
+        if not email:
+            return None
+
+        tags = row.get('tags') or row.get('tag') or row.get('labels') or row.get('categories')
+        if tags is not None:
+            row['tags'] = tags
+
+        row['email'] = email
+        row['source'] = row.get('source', source)
+        return row
+
+    def _iter_recipients_from_csv(self, csv_file: str, source: str) -> Iterator[Recipient]:
+        """Yield recipients from one CSV row by row"""
         csv_path = Path(csv_file)
 
         if not csv_path.exists():
             self.logger.warning(f"Recipients file not found: {csv_file}")
-            return recipients
+            return
 
+        count = 0
         try:
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    email = self._extract_email(row)
-                    if not email:
-                        continue
-
-                    tags = row.get('tags') or row.get('tag') or row.get('labels') or row.get('categories')
-                    if tags is not None:
-                        row['tags'] = tags
-
-                    row['email'] = email
-                    row['source'] = row.get('source', source)
-                    recipients.append(row)
-
-            self.logger.info(f"Loaded {len(recipients)} recipients from {csv_file}")
-            return recipients
+            if self.recipient_cache:
+                process = lambda row: self._process_csv_row(row, source)
+                for recipient in self.recipient_cache.iter_recipients(csv_path, source, process):
+                    count += 1
+                    yield recipient
+            else:
+                with open(csv_path, 'r', encoding='utf-8') as f:
+                    rows = (self._process_csv_row(row, source) for row in csv.DictReader(f))
+                    for recipient in recipients_from_rows(row for row in rows if row is not None):
+                        count += 1
+                        yield recipient
+
+            self.logger.info(f"Loaded {count} recipients from {csv_file}")
 
         except Exception as e:
             self.logger.error(f"Failed to load recipients from {csv_file}: {e}")
-            return []
 
-    def _merge_recipients(self, sources: List[List[Dict]]) -> List[Dict]:
-        merged: Dict[str, Dict] = {}
+    def _load_recipients_from_csv(self, csv_file: str, source: str) -> List[Recipient]:
+        return list(self._iter_recipients_from_csv(csv_file, source))
 
-        for source_list in sources:
-            for recipient in source_list:
-                email = str(recipient.get('email', '')).strip().lower()
-                if not email:
-                    continue
+    @staticmethod
+    def _merge_tags(existing: Optional[str], new: Optional[str]) -> Optional[str]:
+        """Tag string after folding a duplicate row's tags into the first row's.
 
-                if email not in merged:
-                    merged[email] = recipient
-                    continue
-
-                existing = merged[email]
-                existing_tags = self._normalize_tags(existing.get('tags', ''))
-                incoming_tags = self._normalize_tags(recipient.get('tags', ''))
-                if incoming_tags:
-                    combined = sorted({*existing_tags, *incoming_tags})
-                    existing['tags'] = ", ".join(combined)
+        A duplicate's non-empty tags are unioned (sorted) with the first
+        row's; empty tags only fill in where the first row had none.
+        """
+        if new is None:
+            return existing
+        if not new:
+            return existing if existing else new
+        names = {tag.strip() for tag in f"{existing or ''},{new}".split(',') if tag.strip()}
+        return ", ".join(sorted(names))
+
+    def _merge_recipients(self, sources: Iterable[Iterable[Recipient]]) -> Iterator[Recipient]:
+        """Merge recipient streams by email in first-seen order with bounded memory
+
+        Rows are upserted in batches into a temporary on-disk SQLite index
+        keyed by email: a duplicate fills in fields that are empty on the
+        first row and its tags are merged. Rows are then read back in
+        order, so memory does not grow with the size of the sources. Every
+        source is read in full before the first recipient is returned, as
+        a later duplicate can still change an earlier row. Only
+        ``MERGE_FIELDS`` are kept.
+        """
+        fields = MERGE_FIELDS
+        # An empty value is filled in from the first duplicate that has one
+        fill = ', '.join(
+            f"{field} = COALESCE(NULLIF(recipients.{field}, ''), excluded.{field}, recipients.{field})"
+            for field in fields[1:-1]
+        )
+        upsert = (
+            f"INSERT INTO recipients (key, {', '.join(fields)}) VALUES ({', '.join('?' * (len(fields) + 1))}) "
+            f"ON CONFLICT (key) DO UPDATE SET {fill}, tags = merge_tags(recipients.tags, excluded.tags)"
+        )
 
-                for key, value in recipient.items():
-                    if key not in existing or not existing.get(key):
-                        existing[key] = value
+        tag_strings: Dict[Tuple[int, ...], str] = {}
+        index = sqlite3.connect('')  # private temporary database, spilled to disk
+        try:
+            index.create_function('merge_tags', 2, self._merge_tags)
+            index.execute(f"CREATE TABLE recipients (key TEXT PRIMARY KEY, {', '.join(fields)})")
+            batch = []
+            for source in sources:
+                for recipient in source:
+                    email = recipient.email
+                    key = str(email or '').strip().lower()
+                    if not key:
+                        continue
 
-        return list(merged.values())
+                    tags = None
+                    if recipient.tag_ids is not None:
+                        tags = tag_strings.get(recipient.tag_ids)
+                        if tags is None:
+                            tags = tag_strings[recipient.tag_ids] = recipient['tags']
+                    batch.append((key, email, recipient.name, recipient.company,
+                                  recipient.position_type, recipient.source, tags))
+                    if len(batch) >= MERGE_BATCH:
+                        index.executemany(upsert, batch)
+                        batch = []
+            if batch:
+                index.executemany(upsert, batch)
+
+            loader = ColumnLoader(fields)
+            cursor = index.execute(f"SELECT {', '.join(fields)} FROM recipients ORDER BY rowid")
+            rows = cursor.fetchmany(MERGE_BATCH)
+            while rows:
+                yield from loader.build(list(zip(*rows)))
+                rows = cursor.fetchmany(MERGE_BATCH)
+        finally:
+            index.close()
+
+    def _tag_filter(self) -> Optional[Callable[[Dict], bool]]:
+        """Predicate for target_tags, exclude_tags and tag_expression, or None when every recipient matches"""
+        query = TagQuery.from_config(self.config)
+        return query.matches if query else None
 
     def _filter_recipients_by_tags(self, recipients: List[Dict]) -> List[Dict]:
-        target_tags = self._normalize_tags(self.config.get('target_tags', []))
-        mode = str(self.config.get('tag_match_mode', 'any')).lower()
-
-        if not target_tags or mode == 'keywords':
+        query = TagQuery.from_config(self.config)
+        if query is None:
             return recipients
+        return TagIndex(recipients).filter(query)
 
-        filtered = []
-        for recipient in recipients:
-            raw_tags = recipient.get('tags') or recipient.get('matched_tags') or ''
-            tags = self._normalize_tags(raw_tags)
-            if self._matches_tags(tags, target_tags, mode):
-                filtered.append(recipient)
+    def segment_recipients(self, segments: Dict[str, str], csv_file: str = None) -> Dict[str, List[Recipient]]:
+        """Split the recipient list into named segments by tag expression
 
-        return filtered
+        Recipients are loaded and indexed once; each segment is then a
+        bitmap query, e.g. ``{'backend': 'python or go', 'senior': '"staff" -intern'}``.
+        """
+        sources = (
+            self._iter_recipients_from_csv(path, source)
+            for path, source in self._recipient_sources(csv_file)
+        )
+        index = TagIndex(self._merge_recipients(sources))
+        self.logger.info(f"Indexed {len(index)} recipients across {len(index.tag_counts())} tags")
+        return {
+            name: index.filter(TagQuery(parse_tag_expression(expression)))
+            for name, expression in segments.items()
+        }
 
-    def load_recipients(self, csv_file: str = None) -> List[Dict]:
-        """Load recipient list from CSV file(s)"""
+    def _recipient_sources(self, csv_file: str = None) -> List[Tuple[str, str]]:
         base_csv = csv_file or self.config.get('recipients_csv', 'config/recipients.csv')
         linkedin_csv = self.config.get('linkedin_recipients_csv') or self.config.get('linkedin_export_csv')
         google_csv = self.config.get('google_contacts_csv')
@@ -169,14 +238,27 @@ class GmailBot:
         for extra in extra_csvs:
             csv_entries.append((extra, 'extra'))
 
-        sources: List[List[Dict]] = []
-        for path, source in csv_entries:
-            if not path:
-                continue
-            sources.append(self._load_recipients_from_csv(path, source))
+        return [(path, source) for path, source in csv_entries if path]
 
+    def iter_recipients(self, csv_file: str = None, limit: Optional[int] = None) -> Iterator[Recipient]:
+        """Stream merged, tag-filtered recipients, stopping after ``limit``"""
+        sources = (
+            self._iter_recipients_from_csv(path, source)
+            for path, source in self._recipient_sources(csv_file)
+        )
         recipients = self._merge_recipients(sources)
-        recipients = self._filter_recipients_by_tags(recipients)
+
+        matches = self._tag_filter()
+        if matches is not None:
+            recipients = (recipient for recipient in recipients if matches(recipient))
+
+        if limit is not None:
+            recipients = islice(recipients, limit)
+        return recipients
+
+    def load_recipients(self, csv_file: str = None, limit: Optional[int] = None) -> List[Recipient]:
+        """Load recipient list from CSV file(s)"""
+        recipients = list(self.iter_recipients(csv_file, limit))
 
         self.logger.info(f"Prepared {len(recipients)} recipients after filtering")
         return recipients
@@ -191,15 +273,7 @@ class GmailBot:
         if not self.config.get('auto_attach_resume', True):
             return None
 
-        resume_dir = self.uploads_dir / 'resume'
-        if not resume_dir.exists():
-            return None
-
-        candidates = [path for path in resume_dir.iterdir() if path.is_file()]
-        if not candidates:
-            return None
-
-        return max(candidates, key=lambda p: p.stat().st_mtime)
+        return self.attachments.latest_file(self.uploads_dir / 'resume')
 
     def _score_email_candidate(self, candidate: Dict[str, str], recipient_info: Dict) -> int:
         subject = candidate.get('subject', '') or ''
@@ -251,31 +325,129 @@ class GmailBot:
 
         return best
     
-    def create_email(self, recipient: Dict) -> MIMEMultipart:
-        """Create personalized email message"""
-        # Generate AI-powered email content
-        recipient_info = {
+    def _build_recipient_info(self, recipient: Dict) -> Dict:
+        return {
             'name': recipient.get('name', 'Hiring Manager'),
             'company': recipient.get('company', 'Your Company'),
             'position_type': recipient.get('position_type', 'Software Engineering'),
             'my_skills': self.config.get('my_skills', 'Python, React, Node.js'),
             'my_experience': self.config.get('my_experience', '3+ years in software development')
         }
+
+    def _get_message_body(self) -> str:
+        return (
+            self.config.get('message_body')
+            or self.config.get('custom_message')
+            or self.config.get('message_template')
+            or ""
+        )
+
+    def _cluster_key(self, recipient: Dict) -> tuple:
+        tags = self._normalize_tags(recipient.get('tags') or recipient.get('matched_tags') or '')
+        return (
+            str(recipient.get('company', '')).strip().lower(),
+            str(recipient.get('position_type', '')).strip().lower(),
+            tuple(sorted({tag.lower() for tag in tags})),
+        )
+
+    def _ai_available(self) -> bool:
+        """True when AI is enabled, re-enabling it once Ollama recovers"""
+        if not self.ai_enabled and hasattr(self.ai, 'probe_recovery') and self.ai.probe_recovery():
+            self.logger.info("Ollama is reachable again, re-enabling AI emails")
+            self.ai_enabled = True
+        return self.ai_enabled
+
+    def _prepare_email_contents(self, recipients: List[Dict]) -> List[Optional[Dict[str, str]]]:
+        """Generate AI email content for a batch of recipients up front.
+
+        Returns one entry per recipient (None where generation failed or the
+        batch path does not apply) so create_email can fall back per recipient.
+        Large batches in cluster mode get one draft per (company,
+        position_type, tags) group, filled in locally for each recipient.
+        """
+        prepared: List[Optional[Dict[str, str]]] = [None] * len(recipients)
+        if (
+            not recipients
+            or not self._ai_available()
+            or self._get_message_body()
+            or self.config.get('use_multi_model', False)
+            or not hasattr(self.ai, 'generate_cold_emails_batch')
+        ):
+            return prepared
+
+        use_clusters = (
+            bool(self.config.get('cluster_generation', False))
+            and len(recipients) >= int(self.config.get('cluster_min_recipients', 200))
+        )
+
+        if use_clusters:
+            clusters: Dict[tuple, List[int]] = {}
+            for index, recipient in enumerate(recipients):
+                clusters.setdefault(self._cluster_key(recipient), []).append(index)
+            groups = list(clusters.values())
+
+            # Draft with a literal {name} so the text can be filled per recipient
+            infos = []
+            for members in groups:
+                info = self._build_recipient_info(recipients[members[0]])
+                info['name'] = '{name}'
+                infos.append(info)
+        else:
+            groups = [[index] for index in range(len(recipients))]
+            infos = [self._build_recipient_info(recipient) for recipient in recipients]
+
+        try:
+            results = self.ai.generate_cold_emails_batch(infos)
+        except Exception as e:
+            self.logger.warning(f"Batch email generation failed, generating per recipient: {e}")
+            return prepared
+
+        for members, result in zip(groups, results):
+            if result.get('error') or not (result.get('subject') or result.get('body')):
+                continue
+            for index in members:
+                recipient = recipients[index]
+                values = {
+                    'name': recipient.get('name') or 'there',
+                    'email': recipient.get('email', ''),
+                    'company': recipient.get('company', ''),
+                    'position_type': recipient.get('position_type', ''),
+                }
+                prepared[index] = {
+                    'subject': render_template(result['subject'], values),
+                    'body': render_template(result['body'], values),
+                }
+
+        if results and all(result.get('error') for result in results):
+            self.logger.warning("AI email generation failed for the whole batch, using fallback")
+            self.ai_enabled = False
+
+        if use_clusters:
+            reduction = 1 - len(groups) / len(recipients)
+            self.stats['clusters'] = len(groups)
+            self.stats['llm_call_reduction'] = round(reduction, 3)
+            self.logger.info(
+                f"Clustered {len(recipients)} recipients into {len(groups)} drafts "
+                f"({reduction:.0%} fewer LLM calls)"
+            )
+
+        ready = sum(1 for content in prepared if content)
+        self.logger.info(f"Prepared AI content for {ready}/{len(recipients)} recipients")
+        return prepared
+    
+    def build_email_content(self, recipient: Dict, email_content: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Resolve the subject and body for a recipient (custom template, AI or fallback)"""
+        # Generate AI-powered email content
+        recipient_info = self._build_recipient_info(recipient)
         
         message_subject = (
             self.config.get('message_subject')
             or self.config.get('custom_subject')
             or ""
         )
-        message_body = (
-            self.config.get('message_body')
-            or self.config.get('custom_message')
-            or self.config.get('message_template')
-            or ""
-        )
+        message_body = self._get_message_body()
 
-        email_content = None
-        if message_body:
+        if not email_content and message_body:
             variables = {
                 **recipient_info,
                 'email': recipient.get('email', ''),
@@ -283,18 +455,22 @@ class GmailBot:
                 'my_name': self.config.get('my_name', 'Your Name'),
                 'my_title': self.config.get('my_title', ''),
             }
-            personalized_body = message_body
-            if self.ai_enabled and self.config.get('personalize_custom_message', True):
+            personalized_body = render_template(message_body, variables)
+            if self.config.get('personalize_custom_message', True) and self._ai_available():
                 try:
                     personalized_body = self.ai.personalize_template(message_body, variables)
                 except Exception as e:
                     self.logger.warning(f"Template personalization failed, using raw message: {e}")
                     self.ai_enabled = False
 
-            subject = message_subject or f"Exploring opportunities at {recipient_info.get('company', 'your company')}"
+            subject = (
+                render_template(message_subject, variables)
+                if message_subject
+                else f"Exploring opportunities at {recipient_info.get('company', 'your company')}"
+            )
             email_content = {"subject": subject, "body": personalized_body}
-        else:
-            if self.ai_enabled:
+        elif not email_content:
+            if self._ai_available():
                 try:
                     use_multi = bool(self.config.get('use_multi_model', False))
                     raw_models = self.config.get('multi_models')
@@ -305,7 +481,15 @@ class GmailBot:
                         models = [str(m).strip() for m in raw_models if str(m).strip()]
 
                     if use_multi and hasattr(self.ai, 'generate_cold_email_candidates'):
-                        candidates = self.ai.generate_cold_email_candidates(recipient_info, models=models)
+                        first_k = int(self.config.get('multi_model_first_k', 0) or 0)
+                        min_score = int(self.config.get('multi_model_min_score', 6))
+                        candidates = self.ai.generate_cold_email_candidates(
+                            recipient_info,
+                            models=models,
+                            deadline_seconds=self.config.get('multi_model_deadline_seconds', 90),
+                            first_k=first_k or None,
+                            accept=lambda candidate: self._score_email_candidate(candidate, recipient_info) >= min_score,
+                        )
                         email_content = self._select_best_candidate(candidates, recipient_info)
 
                     if not email_content:
@@ -324,6 +508,12 @@ class GmailBot:
                     f"Best,\n{self.config.get('my_name', 'Your Name')}"
                 )
                 email_content = {"subject": subject, "body": body}
+
+        return email_content
+
+    def create_email(self, recipient: Dict, email_content: Optional[Dict[str, str]] = None) -> MIMEMultipart:
+        """Create personalized email message"""
+        email_content = self.build_email_content(recipient, email_content)
         
         # Create email message
         msg = MIMEMultipart('alternative')
@@ -375,64 +565,235 @@ class GmailBot:
                 continue
 
             try:
-                with open(path, 'rb') as file:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(file.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename="{path.name}"'
-                )
-                msg.attach(part)
+                # Encoded once per file version and reused for every recipient
+                msg.attach(self.attachments.get_part(path))
             except Exception as e:
                 self.logger.warning(f"Failed to attach {attachment}: {e}")
         
         return msg
     
-    def send_cold_emails(self, recipient_list: List[Dict] = None) -> Dict:
-        """Send cold emails to recipients"""
-        if recipient_list is None:
-            recipient_list = self.load_recipients()
+    def _create_send_scheduler(self, history: Optional[SentHistory] = None) -> SendScheduler:
+        """Rate limiter seeded with today's sends from earlier runs"""
+        scheduler = SendScheduler.from_config(self.config)
+        if history:
+            scheduler.seed(history.timestamps_since(DAY))
+        return scheduler
+
+    def _open_sent_history(self) -> Optional[SentHistory]:
+        try:
+            return SentHistory(self.config.get('sent_history', {}) or {}, self.log_dir / 'sent_emails.csv')
+        except Exception as e:
+            self.logger.warning(f"Sent history unavailable, sends will not be recorded: {e}")
+            return None
+
+    def _open_outbox(self) -> Optional[EmailOutbox]:
+        outbox_config = self.config.get('outbox', {}) or {}
+        if not outbox_config.get('enabled', True):
+            return None
+        try:
+            return EmailOutbox(outbox_config)
+        except Exception as e:
+            self.logger.warning(f"Email outbox unavailable, sending without it: {e}")
+            return None
+
+    def _select_recipients(
+        self,
+        candidates: Iterator[Dict],
+        limit: int,
+        outbox: Optional[EmailOutbox],
+        campaign_id: str,
+        history: Optional[SentHistory] = None,
+    ) -> Tuple[List[Dict], List[Optional[Dict]]]:
+        """Take the first ``limit`` recipients not recently contacted or handled in the campaign, and queue them"""
+        recontact_days = float(self.config.get('recontact_after_days', 30) or 0)
+        selected: List[Dict] = []
+        skipped = 0
+        recent = 0
+        while len(selected) < limit:
+            chunk = list(islice(candidates, max(limit - len(selected), 100)))
+            if not chunk:
+                break
+
+            if history and recontact_days > 0:
+                contacted = history.contacted_emails([recipient.get('email', '') for recipient in chunk], recontact_days)
+                if contacted:
+                    kept = [
+                        recipient for recipient in chunk
+                        if str(recipient.get('email', '')).strip().lower() not in contacted
+                    ]
+                    recent += len(chunk) - len(kept)
+                    chunk = kept
+
+            entries = outbox.lookup(campaign_id, chunk) if outbox else [None] * len(chunk)
+            for recipient, entry in zip(chunk, entries):
+                if entry and not outbox.is_pending(entry):
+                    skipped += 1
+                    continue
+                selected.append(recipient)
+                if len(selected) >= limit:
+                    break
+
+        if recent:
+            self.logger.info(f"Skipped {recent} recipients contacted within the last {recontact_days:g} days")
+        if skipped:
+            self.logger.info(f"Skipped {skipped} recipients already handled in campaign '{campaign_id}'")
+        if outbox is None:
+            return selected, [None] * len(selected)
+        return selected, outbox.enqueue(campaign_id, selected)
+
+    def send_cold_emails(self, recipient_list: List[Dict] = None, resume: bool = False) -> Dict:
+        """Send cold emails to recipients
+
+        Sends are released by a token-bucket scheduler (burst, hourly and
+        daily caps). Upcoming emails are built in a background thread while
+        the next send slot is pending. Every message is tracked in the
+        outbox under ``campaign_id``: recipients already sent are skipped and
+        stored content is reused, and ``resume=True`` continues the last
+        unfinished campaign from the outbox alone. Recipients emailed within
+        ``recontact_after_days`` are left out, according to the sent history.
+        """
+        history = self._open_sent_history()
+        scheduler = self._create_send_scheduler(history)
+        daily_limit = self.config.get('daily_email_limit', 50)
+        limit = daily_limit
+        remaining = scheduler.remaining_today()
+        if remaining is not None:
+            limit = min(limit, remaining)
+        if limit <= 0:
+            self.logger.info("Daily email limit already reached by earlier runs")
+            if history:
+                history.close()
+            return self.stats
+
+        outbox = self._open_outbox()
+        if resume:
+            campaign_id = outbox.latest_unfinished_campaign() if outbox else None
+            if not campaign_id:
+                self.logger.info("No unfinished email campaign to resume")
+                if outbox:
+                    outbox.close()
+                if history:
+                    history.close()
+                return self.stats
+            entries = outbox.pending(campaign_id)[:limit]
+            recipient_list = [entry['recipient'] for entry in entries]
+            self.logger.info(f"Resuming campaign '{campaign_id}' with {len(entries)} pending emails")
         else:
-            recipient_list = self._filter_recipients_by_tags(recipient_list)
+            # Only the first eligible recipients are needed, so stream the sources
+            if recipient_list is None:
+                candidates = self.iter_recipients()
+            else:
+                candidates = iter(self._filter_recipients_by_tags(recipient_list))
+
+            campaign_id = str(self.config.get('campaign_id') or 'default')
+            recipient_list, entries = self._select_recipients(candidates, limit, outbox, campaign_id, history)
         
+        interrupted = outbox.needs_review(campaign_id) if outbox else []
+        if interrupted:
+            self.logger.warning(
+                f"{len(interrupted)} emails in campaign '{campaign_id}' were interrupted mid-send and may "
+                f"already have been delivered; they are not resent and need manual review: "
+                + ", ".join(entry['recipient'].get('email', '?') for entry in interrupted[:10])
+            )
+            self.stats['needs_review'] = len(interrupted)
+
         if not recipient_list:
             self.logger.warning("No recipients to send emails to")
+            if outbox:
+                outbox.close()
+            if history:
+                history.close()
             return self.stats
         
-        server = self._connect_smtp()
-        
-        daily_limit = self.config.get('daily_email_limit', 50)
-        delay_between_emails = self.config.get('delay_between_emails', 60)  # seconds
-        
-        for i, recipient in enumerate(recipient_list):
-            if self.stats['emails_sent'] >= daily_limit:
-                self.logger.info("Daily email limit reached")
-                break
-            
-            try:
-                # Create personalized email
-                msg = self.create_email(recipient)
-                
-                # Send email
-                server.send_message(msg)
-                
-                self.stats['emails_sent'] += 1
-                self.logger.info(f"Email sent to {recipient.get('name', 'Unknown')} ({recipient['email']})")
-                
-                # Log sent email
-                self._log_sent_email(recipient, msg['Subject'])
-                
-                # Rate limiting
-                if i < len(recipient_list) - 1:
-                    time.sleep(delay_between_emails)
-            
-            except Exception as e:
-                self.stats['emails_failed'] += 1
-                self.logger.error(f"Failed to send email to {recipient.get('email', 'Unknown')}: {e}")
-                continue
-        
-        server.quit()
+        smtp = self._create_smtp_session()
+
+        # Generate the day's AI content in one batch instead of per send,
+        # skipping messages the outbox already rendered
+        todo = [
+            index for index in range(len(recipient_list))
+            if not (entries[index] and entries[index]['content'])
+        ]
+        generated = self._prepare_email_contents([recipient_list[index] for index in todo])
+        prepared: List[Optional[Dict[str, str]]] = [None] * len(recipient_list)
+        for index, content in zip(todo, generated):
+            prepared[index] = content
+        prepare_ahead = max(1, int(self.config.get('prepare_ahead', 2)))
+
+        def build(index: int) -> MIMEMultipart:
+            entry = entries[index]
+            if entry and entry['content']:
+                return self.create_email(recipient_list[index], entry['content'])
+
+            email_content = self.build_email_content(recipient_list[index], prepared[index])
+            if entry:
+                outbox.mark_rendered(entry['key'], email_content)
+            return self.create_email(recipient_list[index], email_content)
+
+        def idle(_):
+            # Write buffered sends while waiting, so a crash loses at most the last one
+            if history:
+                history.flush()
+            smtp.keep_alive()
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-prepare')
+        pending: Dict[int, Future] = {}
+        try:
+            for i, recipient in enumerate(recipient_list):
+                if self.stats['emails_sent'] >= daily_limit:
+                    self.logger.info("Daily email limit reached")
+                    break
+
+                # Keep the next few emails building while we wait for a send slot
+                for ahead in range(i, min(i + prepare_ahead + 1, len(recipient_list))):
+                    if ahead not in pending:
+                        pending[ahead] = executor.submit(build, ahead)
+
+                try:
+                    # Create personalized email
+                    msg = pending.pop(i).result()
+
+                    if not scheduler.acquire(idle=idle, max_wait=HOUR):
+                        self.logger.info("Send window exhausted for now, stopping campaign")
+                        break
+
+                    # Send email; a crash before mark_sent leaves the row 'sending', not pending
+                    if entries[i]:
+                        outbox.mark_sending(entries[i]['key'])
+                    smtp.send_message(msg)
+                    if entries[i]:
+                        outbox.mark_sent(entries[i]['key'])
+
+                    self.stats['emails_sent'] += 1
+                    self.logger.info(f"Email sent to {recipient.get('name', 'Unknown')} ({recipient['email']})")
+
+                    # Log sent email
+                    if history:
+                        history.record(recipient, msg['Subject'], campaign_id)
+
+                except smtplib.SMTPAuthenticationError as e:
+                    self.logger.error(f"SMTP login failed, stopping campaign: {e}")
+                    if entries[i]:
+                        outbox.mark_failed(entries[i]['key'], str(e))
+                    raise
+                except Exception as e:
+                    self.stats['emails_failed'] += 1
+                    self.logger.error(f"Failed to send email to {recipient.get('email', 'Unknown')}: {e}")
+                    if entries[i]:
+                        outbox.mark_failed(entries[i]['key'], str(e))
+                    continue
+        finally:
+            for future in pending.values():
+                future.cancel()
+            executor.shutdown(wait=True)
+            smtp.close()
+            if outbox:
+                self.stats['outbox'] = outbox.get_stats(campaign_id)
+                outbox.close()
+            if history:
+                self.stats['history'] = history.get_stats()
+                history.close()
+
+        self.stats['schedule'] = scheduler.get_stats()
         self.logger.info(f"Email campaign completed. Sent: {self.stats['emails_sent']}, Failed: {self.stats['emails_failed']}")
         
         return self.stats
@@ -445,6 +806,11 @@ class GmailBot:
         # Filter for follow-up candidates
         # This is a simplified version - you'd implement actual tracking
         follow_up_candidates = []
+        smtp = self._create_smtp_session()
+        history = self._open_sent_history()
+        scheduler = self._create_send_scheduler(history)
+        if history:
+            history.close()
         
         for recipient in follow_up_candidates:
             try:
@@ -476,51 +842,30 @@ class GmailBot:
                 
                 msg.attach(MIMEText(body, 'plain'))
                 
-                server = self._connect_smtp()
-                server.send_message(msg)
-                server.quit()
+                if not scheduler.acquire(idle=lambda _: smtp.keep_alive(), max_wait=HOUR):
+                    self.logger.info("Send window exhausted for now, stopping follow-ups")
+                    break
+                smtp.send_message(msg)
                 
                 self.logger.info(f"Follow-up sent to {recipient['email']}")
-                time.sleep(self.config.get('delay_between_emails', 60))
             
+            except smtplib.SMTPAuthenticationError as e:
+                self.logger.error(f"SMTP login failed, stopping follow-ups: {e}")
+                break
             except Exception as e:
                 self.logger.error(f"Follow-up failed for {recipient.get('email')}: {e}")
+
+        smtp.close()
     
-    def _log_sent_email(self, recipient: Dict, subject: str):
-        """Log sent email details"""
-        log_file = self.log_dir / 'sent_emails.csv'
-        log_file.parent.mkdir(exist_ok=True)
-        
-        file_exists = log_file.exists()
-        
-        with open(log_file, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            if not file_exists:
-                writer.writerow(['timestamp', 'recipient_email', 'recipient_name', 'subject', 'company'])
-            
-            from datetime import datetime
-            writer.writerow([
-                datetime.now().isoformat(),
-                recipient.get('email', ''),
-                recipient.get('name', ''),
-                subject,
-                recipient.get('company', '')
-            ])
-    
-    def _load_sent_log(self) -> List[Dict]:
+    def _load_sent_log(self, days: Optional[float] = None) -> List[Dict]:
         """Load sent email log"""
-        log_file = self.log_dir / 'sent_emails.csv'
-        
-        if not log_file.exists():
+        history = self._open_sent_history()
+        if history is None:
             return []
-        
-        sent_emails = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            sent_emails = list(reader)
-        
-        return sent_emails
+        try:
+            return history.entries(days)
+        finally:
+            history.close()
     
     def get_stats(self) -> Dict:
         """Return current statistics"""
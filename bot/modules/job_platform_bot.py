@@ -286,7 +286,7 @@ class JobPlatformBot:
                             'my_experience': self.config.get('my_experience', '')
                         }
                         
-                        cover_letter = self.ai.generate_cover_letter(job_info)
+                        cover_letter = self.ai.generate_cover_letter(job_info, max_chars=1000)
                         cover_letter_field.send_keys(cover_letter[:1000])  # Internshala limit
                     except NoSuchElementException:
                         pass
@@ -16,6 +16,8 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from .template_engine import render_template
+
 
 class LinkedInBot:
     """Automates LinkedIn outreach and job applications"""
@@ -64,6 +66,14 @@ class LinkedInBot:
 
         return matched
 
+    def _ai_available(self) -> bool:
+        """True when AI is enabled, re-enabling it once Ollama recovers"""
+        if not self.ai_enabled and hasattr(self.ai, 'probe_recovery') and self.ai.probe_recovery():
+            self.logger.info("Ollama is reachable again, re-enabling AI messages")
+            self.ai_enabled = True
+            self.ai_error_logged = False
+        return self.ai_enabled
+
     def _build_message(self, recipient_info: Dict) -> str:
         template = self.config.get('message_template', '').strip()
         message_tags = self.config.get('message_tags', [])
@@ -77,9 +87,9 @@ class LinkedInBot:
                 return self.ai.personalize_template(template, variables)
             except Exception as e:
                 self.logger.warning(f"Failed to personalize template: {e}")
-                return template
+                return render_template(template, variables)
 
-        if self.ai_enabled:
+        if self._ai_available():
             try:
                 return self.ai.generate_linkedin_message(recipient_info)
             except Exception as e:
@@ -99,6 +109,34 @@ class LinkedInBot:
             fallback = f"{fallback} {background}"
         return fallback[:300]
 
+    def _prepare_messages(self, recipient_infos: List[Dict]) -> List[Optional[str]]:
+        """Generate connection notes for a batch of people up front.
+
+        Returns one entry per person; None means _build_message should be used.
+        """
+        prepared: List[Optional[str]] = [None] * len(recipient_infos)
+        if (
+            not recipient_infos
+            or not self._ai_available()
+            or self.config.get('message_template', '').strip()
+            or not hasattr(self.ai, 'generate_linkedin_messages_batch')
+        ):
+            return prepared
+
+        try:
+            results = self.ai.generate_linkedin_messages_batch(recipient_infos)
+        except Exception as e:
+            self.logger.warning(f"Batch message generation failed, generating per profile: {e}")
+            return prepared
+
+        for index, result in enumerate(results):
+            if not result.get('error') and result.get('message'):
+                prepared[index] = result['message']
+
+        ready = sum(1 for message in prepared if message)
+        self.logger.info(f"Prepared AI notes for {ready}/{len(recipient_infos)} profiles")
+        return prepared
+
     def _attach_images(self, image_paths: List[str]) -> None:
         if not image_paths:
             return
@@ -371,19 +409,27 @@ class LinkedInBot:
         }
         
         people = self.search_people(search_keywords, filters)
+        recipient_infos = [
+            {
+                'name': person['name'],
+                'title': person['title'],
+                'my_background': self.config.get('my_background', ''),
+                'my_interest': 'exploring opportunities in ' + person['keyword']
+            }
+            for person in people
+        ]
+
+        # Draft the day's notes in one batch instead of stalling per profile
+        daily_limit = self.config.get('daily_connection_limit', 20)
+        prepared = self._prepare_messages(recipient_infos[:daily_limit])
         
-        for person in people:
+        for index, person in enumerate(people):
             try:
                 matched_tags = person.get('matched_tags', [])
                 # Generate personalized message
-                recipient_info = {
-                    'name': person['name'],
-                    'title': person['title'],
-                    'my_background': self.config.get('my_background', ''),
-                    'my_interest': 'exploring opportunities in ' + person['keyword']
-                }
+                recipient_info = recipient_infos[index]
                 
-                message = self._build_message(recipient_info)
+                message = (prepared[index] if index < len(prepared) else None) or self._build_message(recipient_info)
                 
                 # Visit profile
                 self.driver.get(person['url'])
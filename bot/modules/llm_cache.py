@@ -0,0 +1,156 @@
+"""
+LLM Response Cache
+Persistent, content-addressed cache for Ollama completions backed by SQLite
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class LLMCache:
+    """SQLite cache of generated text keyed by a hash of the request"""
+
+    def __init__(self, config: Dict):
+        bot_dir = Path(__file__).resolve().parent.parent
+        self.path = Path(config.get('path') or 'logs/llm_cache.sqlite3').expanduser()
+        if not self.path.is_absolute():
+            self.path = bot_dir / self.path
+        self.ttl_seconds = float(config.get('ttl_seconds', 7 * 24 * 3600))
+        self.max_entries = int(config.get('max_entries', 5000))
+        self.bypass_temperature = float(config.get('bypass_temperature', 0.9))
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+            'bypassed': 0
+        }
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )'''
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)'
+        )
+        self._conn.commit()
+        self.logger.info(f"LLM cache ready at {self.path}")
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, temperature: float, **extra) -> str:
+        """Content hash identifying one generation request"""
+        material = json.dumps(
+            {
+                'model': model,
+                'system': system_prompt or '',
+                'prompt': prompt,
+                'temperature': round(float(temperature), 3),
+                **extra,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def should_bypass(self, temperature: float) -> bool:
+        """High-temperature creative calls are expected to differ every time"""
+        if temperature >= self.bypass_temperature:
+            self.stats['bypassed'] += 1
+            return True
+        return False
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on miss or expiry"""
+        found = self.get_first([key])
+        return found[1] if found else None
+
+    def get_first(self, keys: List[str]) -> Optional[Tuple[int, str]]:
+        """Index and response of the first key with a live entry, counted as one hit or miss"""
+        now = time.time()
+        with self._lock:
+            for index, key in enumerate(keys):
+                row = self._conn.execute(
+                    'SELECT response, created_at FROM responses WHERE key = ?',
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    continue
+
+                response, created_at = row
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._conn.commit()
+                    continue
+
+                self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+                self.stats['hits'] += 1
+                return index, response
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key: str, model: str, response: str):
+        """Store a response and evict least-recently-used entries past the limit"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, model, response, now, now),
+            )
+            self.stats['writes'] += 1
+
+            count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)',
+                    (overflow,),
+                )
+                self.stats['evictions'] += overflow
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL"""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM responses WHERE created_at < ?',
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': entries,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
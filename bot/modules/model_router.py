@@ -0,0 +1,184 @@
+"""
+Ollama Model Router
+Orders candidate models by health and latency, with a per-model circuit breaker
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class _ModelHealth:
+    """Rolling outcome window and circuit state for one model"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_size: int):
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_owner: Optional[int] = None
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def p50_latency(self, max_age: float = None) -> Optional[float]:
+        now = time.monotonic()
+        recent = [
+            latency for recorded_at, latency in self.latencies
+            if max_age is None or now - recorded_at <= max_age
+        ]
+        if not recent:
+            return None
+        return statistics.median(recent)
+
+
+class ModelRouter:
+    """Routes generations to the fastest healthy model.
+
+    A model's circuit opens after ``failure_threshold`` consecutive failures
+    or when its error rate over the last ``window_size`` calls reaches
+    ``error_rate_threshold``. Open models are skipped until ``cooldown_seconds``
+    have passed, then a single half-open probe decides whether to close the
+    circuit again or restart the cooldown.
+
+    A primary without recent latency samples ranks as if it were fastest, so
+    one that was slow once gets re-measured after ``latency_ttl_seconds``.
+    Unmeasured fallbacks rank after every measured model.
+    """
+
+    def __init__(self, config: Dict):
+        self.window_size = int(config.get('window_size', 20))
+        self.failure_threshold = int(config.get('failure_threshold', 3))
+        self.error_rate_threshold = float(config.get('error_rate_threshold', 0.5))
+        self.min_samples = int(config.get('min_samples', 5))
+        self.cooldown_seconds = float(config.get('cooldown_seconds', 120))
+        self.latency_ttl_seconds = float(config.get('latency_ttl_seconds', 600))
+        self.prefer_fastest = bool(config.get('prefer_fastest', True))
+        self.model_tiers = {str(k): int(v) for k, v in (config.get('model_tiers', {}) or {}).items()}
+        self.min_quality_tier = int(config.get('min_quality_tier', 0))
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._health: Dict[str, _ModelHealth] = {}
+
+    def _get(self, model: str) -> _ModelHealth:
+        if model not in self._health:
+            self._health[model] = _ModelHealth(self.window_size)
+        return self._health[model]
+
+    def _cooling_down(self, health: _ModelHealth, now: float) -> bool:
+        return health.state == _ModelHealth.OPEN and now - health.opened_at < self.cooldown_seconds
+
+    def order(self, models: List[str]) -> List[str]:
+        """Return the models worth trying, best candidate first"""
+        now = time.monotonic()
+        with self._lock:
+            ranked = []
+            for index, model in enumerate(models):
+                health = self._get(model)
+                if self._cooling_down(health, now):
+                    continue
+
+                meets_tier = self.model_tiers.get(model, 0) >= self.min_quality_tier
+                latency = health.p50_latency(self.latency_ttl_seconds)
+                if latency is None:
+                    # Unmeasured: re-measure the primary, keep fallbacks as a last resort
+                    latency = 0.0 if index == 0 else float('inf')
+                if self.prefer_fastest:
+                    key = (not meets_tier, latency, index)
+                else:
+                    key = (not meets_tier, index)
+                ranked.append((key, model))
+
+        ranked.sort(key=lambda item: item[0])
+        return [model for _, model in ranked]
+
+    def is_open(self, model: str) -> bool:
+        """True while a model's circuit is open (tripped and not yet probed)"""
+        with self._lock:
+            return self._get(model).state == _ModelHealth.OPEN
+
+    def allow(self, model: str) -> bool:
+        """Claim an attempt on a model; only one half-open probe runs at a time"""
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(model)
+            if health.state == _ModelHealth.CLOSED:
+                return True
+            if self._cooling_down(health, now):
+                return False
+            if health.probing:
+                return False
+
+            health.state = _ModelHealth.HALF_OPEN
+            health.probing = True
+            health.probe_owner = threading.get_ident()
+            self.logger.info(f"Probing model {model} after cooldown")
+            return True
+
+    def release(self, model: str):
+        """Give back a half-open probe this thread claimed but never recorded an outcome for"""
+        with self._lock:
+            health = self._get(model)
+            if health.probing and health.probe_owner == threading.get_ident():
+                health.probing = False
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            health = self._get(model)
+            health.latencies.append((time.monotonic(), latency))
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            health.probing = False
+            if health.state != _ModelHealth.CLOSED:
+                health.state = _ModelHealth.CLOSED
+                self.logger.info(f"Circuit closed for model {model}")
+
+    def record_failure(self, model: str):
+        with self._lock:
+            health = self._get(model)
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            health.probing = False
+
+            should_open = (
+                health.state == _ModelHealth.HALF_OPEN
+                or health.consecutive_failures >= self.failure_threshold
+                or (
+                    len(health.outcomes) >= self.min_samples
+                    and health.error_rate() >= self.error_rate_threshold
+                )
+            )
+            if should_open:
+                if health.state != _ModelHealth.OPEN:
+                    self.logger.warning(
+                        f"Circuit opened for model {model} for {self.cooldown_seconds:.0f}s "
+                        f"(error rate {health.error_rate():.0%})"
+                    )
+                health.state = _ModelHealth.OPEN
+                health.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict:
+        """Return per-model circuit state, error rate and p50 latency"""
+        with self._lock:
+            return {
+                model: {
+                    'state': health.state,
+                    'error_rate': round(health.error_rate(), 3),
+                    'p50_latency': round(health.p50_latency(), 3) if health.latencies else None,
+                    'samples': len(health.outcomes),
+                    'tier': self.model_tiers.get(model, 0)
+                }
+                for model, health in self._health.items()
+            }
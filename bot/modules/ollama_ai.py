@@ -3,59 +3,636 @@ Ollama AI Integration
 Handles all AI-powered text generation using local Ollama models
 """
 
+import json
 import requests
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .endpoint_pool import EndpointPool
+from .llm_cache import LLMCache
+from .model_router import ModelRouter
+from .ollama_metrics import OllamaMetrics
+from .retry_policy import DeadlineExceeded, RetryPolicy
+from .single_flight import SingleFlight
+from .template_engine import compile_template
 
 
 class OllamaAI:
     """Interface for Ollama local AI models"""
+
+    # Per-task generation budgets. num_predict caps output tokens (roughly
+    # four characters per token) so the model stops near the platform limit
+    # instead of writing text that is truncated afterwards.
+    GENERATION_PROFILES: Dict[str, Dict] = {
+        'x_post': {
+            'temperature': 0.9,
+            'num_predict': 96,
+            'num_ctx': 1024,
+            'max_chars': 280,
+            'stop': ['\n\n\n'],
+            'coalesce': False,  # posts should differ from each other
+        },
+        'linkedin_message': {
+            'temperature': 0.8,
+            'num_predict': 100,
+            'num_ctx': 1024,
+            'max_chars': 300,
+            'stop': ['\nNote:', '\n---'],
+        },
+        'linkedin_follow_up': {
+            'temperature': 0.7,
+            'num_predict': 160,
+            'num_ctx': 1024,
+            'max_chars': 500,
+            'stop': ['\nNote:', '\n---'],
+        },
+        'cold_email': {
+            'temperature': 0.8,
+            'num_predict': 480,
+            'num_ctx': 2048,
+            'max_chars': None,
+            'stop': [],
+        },
+        'cover_letter': {
+            'temperature': 0.7,
+            'num_predict': 640,
+            'num_ctx': 2048,
+            'max_chars': None,
+            'stop': [],
+        },
+        'personalize_template': {
+            'temperature': 0.6,
+            'num_predict': 512,
+            'num_ctx': 2048,
+            'max_chars': None,
+            'stop': [],
+        },
+        'improve_text': {
+            'temperature': 0.6,
+            'num_predict': 512,
+            'num_ctx': 2048,
+            'max_chars': None,
+            'stop': [],
+        },
+    }
     
+    COLD_EMAIL_SYSTEM_PROMPT = """You are an expert at writing professional cold emails for job seeking. 
+        Write compelling, personalized emails that get responses. Be concise and action-oriented."""
+
+    # Schema sent as Ollama's format when structured_output is "schema"
+    COLD_EMAIL_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "subject": {"type": "string"},
+            "body": {"type": "string"},
+        },
+        "required": ["subject", "body"],
+    }
+
     def __init__(self, config: Dict):
-        self.base_url = config.get('base_url', 'http://localhost:11434')
+        # Several servers can share the load; base_url stays the first of them
+        base_urls = config.get('base_urls') or [config.get('base_url', 'http://localhost:11434')]
+        self.base_url = base_urls[0].rstrip('/')
         self.model = config.get('model', 'llama2')
         self.fallback_models = config.get('fallback_models', []) or []
         self.logger = logging.getLogger(__name__)
+
+        # HTTP transport: one keep-alive session shared by every request
+        self.pool_size = int(config.get('pool_size', 4))
+        self.connect_timeout = float(config.get('connect_timeout', 5))
+        self.read_timeout = float(config.get('read_timeout', config.get('timeout', 60)))
+        self.endpoints = EndpointPool(base_urls, config.get('endpoints', {}) or {}, self._check_endpoint)
+        self.session = self._create_session()
+        self.max_in_flight = max(1, int(config.get('max_in_flight', 2)))
+
+        # How long Ollama keeps models resident after a request (e.g. "30m", -1 = forever)
+        self.keep_alive = config.get('keep_alive', '30m')
+        self.model_status: Dict = {
+            'available': [],
+            'resident': [],
+            'warm_up_seconds': {}
+        }
+
+        self.router = ModelRouter(config.get('router', {}) or {})
+        self.retry_policy = RetryPolicy(config.get('retry', {}) or {})
+
+        # Bots call probe_recovery() after AI failures; checks are throttled
+        self.recovery_probe_interval = float(config.get('recovery_probe_interval', 60))
+        self._last_recovery_probe = 0.0
+        self.metrics = OllamaMetrics(int(config.get('metrics_max_samples', 1000)))
+        # Each run appends its metrics here on close() so reports can aggregate them
+        self.metrics_log = Path(config.get('metrics_log') or 'logs/ollama_metrics.jsonl').expanduser()
+        if not self.metrics_log.is_absolute():
+            self.metrics_log = Path(__file__).resolve().parent.parent / self.metrics_log
+
+        # Ask for JSON cold emails: True/"json" or "schema" (needs a newer Ollama)
+        structured = config.get('structured_output', True)
+        self.structured_output = 'schema' if structured == 'schema' else bool(structured)
+        self.structured_stats = {
+            'valid': 0,
+            'repaired': 0,
+            'fallback': 0
+        }
+
+        # Identical prompts share one Ollama call (per-task 'coalesce' flag)
+        self.single_flight = SingleFlight(float(config.get('coalesce_window_seconds', 300)))
+
+        # Profiles from the ollama.generation_profiles section override the defaults
+        self.generation_profiles = {task: dict(profile) for task, profile in self.GENERATION_PROFILES.items()}
+        for task, overrides in (config.get('generation_profiles', {}) or {}).items():
+            self.generation_profiles.setdefault(task, {}).update(overrides or {})
+
+        cache_config = config.get('cache', {}) or {}
+        self.cache: Optional[LLMCache] = None
+        if cache_config.get('enabled', True):
+            try:
+                self.cache = LLMCache(cache_config)
+            except Exception as e:
+                self.logger.warning(f"LLM cache unavailable, continuing without it: {e}")
+
         self.logger.info(f"Initialized Ollama with model: {self.model}")
+
+    def _create_session(self) -> requests.Session:
+        """Create a pooled keep-alive HTTP session for the Ollama server."""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=len(self.endpoints),
+            pool_maxsize=self.pool_size,
+            pool_block=False,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    @property
+    def timeout(self) -> tuple:
+        """(connect, read) timeout pair used for generation requests"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def _timeout_for(self, deadline: Optional[float]) -> tuple:
+        """Timeout pair shortened so a request cannot outlive the task deadline"""
+        if deadline is None:
+            return self.timeout
+        remaining = max(0.1, deadline - time.monotonic())
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    def close(self):
+        """Save this run's metrics and close pooled HTTP connections to the Ollama server"""
+        try:
+            self.metrics.save(self.metrics_log)
+        except OSError as e:
+            self.logger.warning(f"Failed to save Ollama metrics to {self.metrics_log}: {e}")
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+        self.logger.info("Ollama HTTP session closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
-    def _generate_with_model(
+    def _get_options(self, task: Optional[str]) -> Dict:
+        """Ollama runtime options (num_predict, num_ctx, stop) for a task"""
+        profile = self.generation_profiles.get(task or '', {})
+        options = {}
+        for key in ('num_predict', 'num_ctx'):
+            if profile.get(key):
+                options[key] = int(profile[key])
+        if profile.get('stop'):
+            options['stop'] = list(profile['stop'])
+        return options
+
+    def _build_payload(
         self,
         prompt: str,
         model: str,
         system_prompt: str = None,
         temperature: float = 0.7,
-    ) -> str:
-        """Generate text using a specific Ollama model."""
-        url = f"{self.base_url}/api/generate"
+        stream: bool = False,
+        options: Optional[Dict] = None,
+        response_format: Optional[object] = None,
+    ) -> Dict:
+        """Build the /api/generate request body"""
         payload = {
             "model": model,
             "prompt": prompt,
-            "temperature": temperature,
-            "stream": False,
+            "stream": stream,
+            "options": {"temperature": temperature, **(options or {})},
         }
 
+        # "json" or a JSON schema constrains the model to structured output
+        if response_format:
+            payload["format"] = response_format
+
         if system_prompt:
             payload["system"] = system_prompt
 
-        response = requests.post(url, json=payload, timeout=60)
-        response.raise_for_status()
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        return payload
+
+    def _post_generate(
+        self, payload: Dict, stream: bool = False, deadline: Optional[float] = None
+    ) -> Tuple[str, requests.Response]:
+        """POST to /api/generate, failing over to another endpoint on connection or server errors
+
+        Returns the endpoint used, which stays reserved until the caller releases it.
+        """
+        tried: List[str] = []
+        while True:
+            base_url = self.endpoints.acquire(exclude=tried)
+            response = None
+            try:
+                response = self.session.post(
+                    f"{base_url}/api/generate", json=payload, timeout=self._timeout_for(deadline), stream=stream
+                )
+                response.raise_for_status()
+                return base_url, response
+            except Exception as e:
+                if response is not None:
+                    response.close()
+                endpoint_error = self._is_endpoint_error(e)
+                self.endpoints.release(base_url, ok=not endpoint_error)
+                tried.append(base_url)
+                if not endpoint_error or len(tried) >= len(self.endpoints):
+                    raise
+                self.logger.warning(f"Ollama endpoint {base_url} failed ({e}), trying another")
 
-        result = response.json()
+    def _generate_with_model(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        options: Optional[Dict] = None,
+        task: Optional[str] = None,
+        response_format: Optional[object] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """Generate text using a specific Ollama model."""
+        payload = self._build_payload(
+            prompt, model, system_prompt, temperature, stream=False, options=options, response_format=response_format
+        )
+
+        base_url = None
+        started = time.monotonic()
+        try:
+            base_url, response = self._post_generate(payload, deadline=deadline)
+            result = response.json()
+        except Exception as e:
+            if base_url:
+                self.endpoints.release(base_url, ok=not self._is_endpoint_error(e))
+            self._record_failure(task, model)
+            raise
+
+        self.endpoints.release(base_url, time.monotonic() - started)
+        self._record_success(task, model, started, result)
         return result.get('response', '').strip()
 
-    def _generate(self, prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
-        """Generate text using Ollama API"""
-        models_to_try = [self.model, *self.fallback_models]
+    def _stream_with_model(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: str = None,
+        temperature: float = 0.7,
+        max_chars: Optional[int] = None,
+        stop: Optional[Callable[[str], bool]] = None,
+        options: Optional[Dict] = None,
+        task: Optional[str] = None,
+        response_format: Optional[object] = None,
+        deadline: Optional[float] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[str]:
+        """Stream text from a specific Ollama model as it is generated.
+
+        Generation is cut off as soon as ``max_chars`` characters have been
+        produced or ``stop(text_so_far)`` returns True. Leaving the request
+        early closes the connection, which makes Ollama abandon the rest of
+        the completion instead of computing text we would truncate anyway.
+        Passing ``deadline`` aborts the stream with DeadlineExceeded. Setting
+        ``cancel`` abandons the stream without recording a success or a
+        latency sample for the model, since it did not get to finish.
+        """
+        payload = self._build_payload(
+            prompt, model, system_prompt, temperature, stream=True, options=options, response_format=response_format
+        )
+
+        text = ''
+        final: Dict = {}
+        base_url = None
+        endpoint_ok = True
+        cancelled = False
+        started = time.monotonic()
+        try:
+            base_url, response = self._post_generate(payload, stream=True, deadline=deadline)
+            with response:
+                for line in response.iter_lines():
+                    self.retry_policy.check_deadline(deadline)
+                    if not line:
+                        continue
+
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise RuntimeError(chunk['error'])
+
+                    piece = chunk.get('response', '')
+                    if not text:
+                        piece = piece.lstrip()
+
+                    if max_chars is not None and len(text) + len(piece) >= max_chars:
+                        piece = piece[:max_chars - len(text)]
+                        if piece:
+                            yield piece
+                        break
+
+                    if piece:
+                        text += piece
+                        yield piece
+
+                    if chunk.get('done'):
+                        final = chunk
+                        break
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        return
+                    if stop and stop(text):
+                        break
+        except GeneratorExit:
+            # The consumer stopped reading; the model itself was healthy
+            self._record_success(task, model, started, final)
+            raise
+        except Exception as e:
+            endpoint_ok = not self._is_endpoint_error(e)
+            # Running out of task time says nothing about the model's health
+            if not isinstance(e, DeadlineExceeded):
+                self._record_failure(task, model)
+            raise
+        finally:
+            if base_url:
+                latency = None if cancelled else time.monotonic() - started
+                self.endpoints.release(base_url, latency, endpoint_ok)
+
+        # Timing fields only arrive on the final chunk, so early stops record latency only
+        self._record_success(task, model, started, final)
+
+    def _record_success(self, task: Optional[str], model: str, started: float, data: Optional[Dict] = None):
+        latency = time.monotonic() - started
+        self.router.record_success(model, latency)
+        self.metrics.record(task, model, latency, data)
+
+    def _record_failure(self, task: Optional[str], model: str):
+        self.router.record_failure(model)
+        self.metrics.record_error(task, model)
+
+    @staticmethod
+    def _is_endpoint_error(error: Exception) -> bool:
+        """Connection problems and server errors count against the endpoint, not the model"""
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return isinstance(error, requests.HTTPError) and response is not None and response.status_code >= 500
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: Optional[float] = None,
+        max_chars: Optional[int] = None,
+        stop: Optional[Callable[[str], bool]] = None,
+        task: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Stream generated text, falling back to other models before the first token"""
+        profile = self.generation_profiles.get(task or '', {})
+        if temperature is None:
+            temperature = profile.get('temperature', 0.7)
+        if max_chars is None:
+            max_chars = profile.get('max_chars')
+        options = self._get_options(task)
+
+        models_to_try = self._route_models()
+        deadline = self.retry_policy.deadline_for(task)
         last_error: Optional[Exception] = None
 
         for model in models_to_try:
             try:
-                return self._generate_with_model(prompt, model, system_prompt, temperature)
+                # Before claiming a half-open probe that no attempt would use
+                self.retry_policy.check_deadline(deadline)
+            except DeadlineExceeded as e:
+                last_error = e
+                break
+            if not self.router.allow(model):
+                continue
+            started = False
+            try:
+                for piece in self._stream_with_model(
+                    prompt, model, system_prompt, temperature, max_chars, stop, options, task,
+                    deadline=deadline,
+                ):
+                    started = True
+                    yield piece
+                return
+            except Exception as e:
+                if started:
+                    raise
+                last_error = e
+                self.logger.error(f"Ollama streaming failed (model={model}): {e}")
+            finally:
+                self.router.release(model)
+
+        raise last_error if last_error else RuntimeError("Ollama generation failed")
+
+    def _route_models(self) -> List[str]:
+        """Configured models ordered by the router, unhealthy ones removed"""
+        models = self.router.order([self.model, *self.fallback_models])
+        if not models:
+            raise RuntimeError("No healthy Ollama model available (all circuits open)")
+        return models
+
+    def _generate(
+        self,
+        prompt: str,
+        system_prompt: str = None,
+        temperature: Optional[float] = None,
+        use_cache: bool = True,
+        max_chars: Optional[int] = None,
+        stop: Optional[Callable[[str], bool]] = None,
+        task: Optional[str] = None,
+        response_format: Optional[object] = None,
+    ) -> str:
+        """Generate text using Ollama API
+
+        ``task`` selects a generation profile that supplies the default
+        temperature, character budget and token limits. With ``max_chars`` or
+        ``stop`` set the completion is streamed and cut off early; otherwise a
+        single non-streaming request is made.
+        """
+        profile = self.generation_profiles.get(task or '', {})
+        if temperature is None:
+            temperature = profile.get('temperature', 0.7)
+        if max_chars is None:
+            max_chars = profile.get('max_chars')
+        options = self._get_options(task)
+        configured_models = [self.model, *self.fallback_models]
+
+        if stop is None and profile.get('coalesce', True):
+            flight_key = (
+                tuple(configured_models),
+                system_prompt,
+                prompt,
+                temperature,
+                max_chars,
+                repr(sorted(options.items())),
+                repr(response_format),
+                use_cache,
+            )
+            return self.single_flight.do(
+                flight_key,
+                lambda: self._generate_resolved(
+                    prompt, system_prompt, temperature, use_cache, max_chars, stop, options, task, response_format
+                ),
+            )
+
+        return self._generate_resolved(
+            prompt, system_prompt, temperature, use_cache, max_chars, stop, options, task, response_format
+        )
+
+    def _generate_resolved(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        use_cache: bool,
+        max_chars: Optional[int],
+        stop: Optional[Callable[[str], bool]],
+        options: Dict,
+        task: Optional[str],
+        response_format: Optional[object] = None,
+    ) -> str:
+        """Run one generation with profile defaults already applied"""
+        configured_models = [self.model, *self.fallback_models]
+        last_error: Optional[Exception] = None
+
+        # A stop callback cannot be part of the cache key
+        cache = self.cache if use_cache and self.cache and stop is None else None
+        if cache and cache.should_bypass(temperature):
+            cache = None
+        key_extra = {'options': options} if options else {}
+        if max_chars is not None:
+            key_extra['max_chars'] = max_chars
+        if response_format:
+            key_extra['format'] = response_format
+
+        if cache:
+            # Every configured model's entry can answer; the lookup counts once
+            found = cache.get_first([
+                LLMCache.make_key(model, system_prompt, prompt, temperature, **key_extra)
+                for model in configured_models
+            ])
+            if found is not None:
+                index, cached = found
+                self.logger.debug(f"LLM cache hit (model={configured_models[index]})")
+                return cached
+
+        # Transient errors are retried on the same model before falling back, but
+        # each model only retries within its share of the time left so the
+        # fallbacks still get a turn
+        deadline = self.retry_policy.deadline_for(task)
+        models = self._route_models()
+        for position, model in enumerate(models):
+            try:
+                # Before claiming a half-open probe that no attempt would use
+                self.retry_policy.check_deadline(deadline)
+            except DeadlineExceeded as e:
+                last_error = e
+                self.logger.error(f"Ollama generation for task {task or 'generic'} ran out of time")
+                break
+            if not self.router.allow(model):
+                continue
+            retry_until = None
+            if deadline is not None:
+                now = time.monotonic()
+                retry_until = now + (deadline - now) / (len(models) - position)
+
+            def attempt(model=model) -> str:
+                if max_chars is not None or stop is not None:
+                    return ''.join(
+                        self._stream_with_model(
+                            prompt, model, system_prompt, temperature, max_chars, stop, options, task,
+                            response_format, deadline,
+                        )
+                    ).strip()
+                return self._generate_with_model(
+                    prompt, model, system_prompt, temperature, options, task, response_format, deadline
+                )
+
+            try:
+                result = self.retry_policy.call(
+                    attempt,
+                    deadline,
+                    f"Ollama generation (model={model})",
+                    retry_until=retry_until,
+                    can_retry=lambda model=model: not self.router.is_open(model),
+                )
+                if cache and result:
+                    cache.set(
+                        LLMCache.make_key(model, system_prompt, prompt, temperature, **key_extra),
+                        model,
+                        result,
+                    )
+                return result
+            except DeadlineExceeded as e:
+                last_error = e
+                self.logger.error(f"Ollama generation for task {task or 'generic'} ran out of time")
+                break
             except Exception as e:
                 last_error = e
                 self.logger.error(f"Ollama generation failed (model={model}): {e}")
+            finally:
+                # A deadline hit before any attempt records no outcome to end the probe
+                self.router.release(model)
 
         raise last_error if last_error else RuntimeError("Ollama generation failed")
+
+    def _parse_email(self, result: str) -> Dict[str, str]:
+        """Split a SUBJECT:/BODY: formatted completion into its parts"""
+        parts = result.split('BODY:', 1)
+        subject = parts[0].replace('SUBJECT:', '').strip()
+        body = parts[1].strip() if len(parts) > 1 else result
+        return {
+            'subject': subject,
+            'body': body
+        }
+
+    def _fan_out(self, func, items: List) -> List[Tuple[object, Optional[Exception]]]:
+        """Run func over items concurrently, keeping order and per-item errors"""
+        if not items:
+            return []
+
+        def run(item):
+            try:
+                return func(item), None
+            except Exception as e:
+                return None, e
+
+        workers = min(self.max_in_flight, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ollama-batch') as executor:
+            outcomes = list(executor.map(run, items))
+
+        failures = sum(1 for _, error in outcomes if error is not None)
+        if failures:
+            self.logger.warning(f"Batch generation finished with {failures}/{len(items)} failures")
+        return outcomes
     
     def generate_linkedin_message(self, recipient_info: Dict) -> str:
         """Generate personalized LinkedIn connection message"""
@@ -75,7 +652,20 @@ My interest: {recipient_info.get('my_interest', 'Interested in potential opportu
 
 Generate only the message text, no additional formatting or explanations."""
         
-        return self._generate(prompt, system_prompt, temperature=0.8)
+        return self._generate(prompt, system_prompt, task='linkedin_message')
+
+    def generate_linkedin_messages_batch(self, people: List[Dict]) -> List[Dict[str, str]]:
+        """Generate LinkedIn connection notes for many people concurrently.
+
+        Results are returned in input order as ``{'message', 'error'}`` dicts.
+        """
+        results = []
+        for message, error in self._fan_out(self.generate_linkedin_message, people):
+            if error is not None:
+                results.append({'message': '', 'error': str(error)})
+            else:
+                results.append({'message': message, 'error': None})
+        return results
     
     def generate_linkedin_follow_up(self, context: str) -> str:
         """Generate follow-up message for LinkedIn"""
@@ -88,14 +678,19 @@ Generate only the message text, no additional formatting or explanations."""
 
 Keep it under 500 characters, warm and professional."""
         
-        return self._generate(prompt, system_prompt, temperature=0.7)
+        return self._generate(prompt, system_prompt, task='linkedin_follow_up')
     
-    def generate_cold_email(self, recipient_info: Dict) -> Dict[str, str]:
-        """Generate cold email subject and body"""
-        system_prompt = """You are an expert at writing professional cold emails for job seeking. 
-        Write compelling, personalized emails that get responses. Be concise and action-oriented."""
-        
-        prompt = f"""Generate a cold email for job opportunities:
+    def _cold_email_prompt(self, recipient_info: Dict) -> str:
+        if self.structured_output:
+            output_format = """Respond with a JSON object only, no other text:
+{"subject": "<subject line>", "body": "<email body>"}"""
+        else:
+            output_format = """Format as:
+SUBJECT: [subject line]
+BODY:
+[email body]"""
+
+        return f"""Generate a cold email for job opportunities:
 
 Recipient: {recipient_info.get('name', 'Hiring Manager')}
 Company: {recipient_info.get('company', 'Unknown')}
@@ -108,78 +703,199 @@ Generate:
 1. Subject line (under 60 characters)
 2. Email body (under 300 words)
 
-Format as:
-SUBJECT: [subject line]
-BODY:
-[email body]"""
-        
-        result = self._generate(prompt, system_prompt, temperature=0.8)
-        
-        # Parse subject and body
-        parts = result.split('BODY:', 1)
-        subject = parts[0].replace('SUBJECT:', '').strip()
-        body = parts[1].strip() if len(parts) > 1 else result
-        
+{output_format}"""
+
+    @property
+    def _cold_email_format(self) -> Optional[object]:
+        if not self.structured_output:
+            return None
+        return self.COLD_EMAIL_SCHEMA if self.structured_output == 'schema' else 'json'
+
+    def _validate_email_json(self, raw: str) -> Dict[str, str]:
+        """Parse and strictly validate a structured cold email; raises ValueError"""
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"not valid JSON ({e})")
+
+        if not isinstance(data, dict):
+            raise ValueError("top-level value is not an object")
+
+        subject = data.get('subject')
+        body = data.get('body')
+        if not isinstance(subject, str) or not subject.strip():
+            raise ValueError("missing subject")
+        if not isinstance(body, str) or not body.strip():
+            raise ValueError("missing body")
+
+        subject = subject.strip()
+        if '\n' in subject or len(subject) > 150 or 'body:' in subject.lower():
+            raise ValueError("subject contains more than a subject line")
+
         return {
             'subject': subject,
-            'body': body
+            'body': body.strip()
         }
 
+    def _parse_structured_email(self, raw: str, repair: Callable[[str], str]) -> Dict[str, str]:
+        """Validate structured output, allowing one repair round before text parsing"""
+        try:
+            content = self._validate_email_json(raw)
+            self.structured_stats['valid'] += 1
+            return content
+        except ValueError as e:
+            error = e
+
+        repair_prompt = f"""The text below should be a JSON object with string fields "subject" and "body",
+but it is invalid: {error}.
+
+{raw}
+
+Return only the corrected JSON object."""
+        try:
+            content = self._validate_email_json(repair(repair_prompt))
+            self.structured_stats['repaired'] += 1
+            return content
+        except Exception as e:
+            self.logger.warning(f"Structured email repair failed, parsing as text: {e}")
+
+        self.structured_stats['fallback'] += 1
+        return self._parse_email(raw)
+
+    def generate_cold_email(self, recipient_info: Dict) -> Dict[str, str]:
+        """Generate cold email subject and body"""
+        system_prompt = self.COLD_EMAIL_SYSTEM_PROMPT
+        prompt = self._cold_email_prompt(recipient_info)
+        
+        result = self._generate(prompt, system_prompt, task='cold_email', response_format=self._cold_email_format)
+        
+        # Parse subject and body
+        if self.structured_output:
+            return self._parse_structured_email(
+                result,
+                lambda repair_prompt: self._generate(
+                    repair_prompt,
+                    temperature=0.0,
+                    use_cache=False,
+                    task='cold_email',
+                    response_format=self._cold_email_format,
+                ),
+            )
+        return self._parse_email(result)
+
+    def generate_cold_emails_batch(self, recipients: List[Dict]) -> List[Dict[str, str]]:
+        """Generate cold emails for many recipients concurrently.
+
+        Results are returned in input order. Each item carries ``subject``,
+        ``body`` and ``error``; failed items have empty text and the error
+        message so callers can fall back per recipient.
+        """
+        results = []
+        for content, error in self._fan_out(self.generate_cold_email, recipients):
+            if error is not None:
+                results.append({'subject': '', 'body': '', 'error': str(error)})
+            else:
+                results.append({**content, 'error': None})
+        return results
+
     def generate_cold_email_candidates(
         self,
         recipient_info: Dict,
         models: Optional[List[str]] = None,
         temperature: Optional[float] = None,
+        deadline_seconds: Optional[float] = None,
+        first_k: Optional[int] = None,
+        accept: Optional[Callable[[Dict[str, str]], bool]] = None,
     ) -> List[Dict[str, str]]:
-        """Generate multiple cold email candidates across models."""
-        system_prompt = """You are an expert at writing professional cold emails for job seeking.
-        Write compelling, personalized emails that get responses. Be concise and action-oriented."""
+        """Generate multiple cold email candidates across models.
 
-        prompt = f"""Generate a cold email for job opportunities:
+        All models are queried concurrently. Collection ends when every model
+        has answered, when ``deadline_seconds`` elapses, or - with ``first_k``
+        set - once ``first_k`` candidates passing ``accept`` are in; remaining
+        generations are then cancelled.
+        """
+        system_prompt = self.COLD_EMAIL_SYSTEM_PROMPT
+        prompt = self._cold_email_prompt(recipient_info)
+        response_format = self._cold_email_format
 
-Recipient: {recipient_info.get('name', 'Hiring Manager')}
-Company: {recipient_info.get('company', 'Unknown')}
-Position Type: {recipient_info.get('position_type', 'Software Engineering')}
+        profile = self.generation_profiles.get('cold_email', {})
+        temperature_value = temperature if temperature is not None else profile.get('temperature', 0.8)
+        options = self._get_options('cold_email')
+        models_to_use = models or [self.model, *self.fallback_models]
+        healthy = set(self.router.order(models_to_use))
+        models_to_use = [model for model in models_to_use if model in healthy]
+        if not models_to_use:
+            return []
 
-My Skills: {recipient_info.get('my_skills', 'Full-stack development, Python, React')}
-My Experience: {recipient_info.get('my_experience', '2+ years in software development')}
+        cancel = threading.Event()
 
-Generate:
-1. Subject line (under 60 characters)
-2. Email body (under 300 words)
+        def generate(model: str) -> Dict[str, str]:
+            result = ''.join(self._stream_with_model(
+                prompt,
+                model,
+                system_prompt,
+                temperature_value,
+                options=options,
+                task='cold_email_candidate',
+                response_format=response_format,
+                cancel=cancel,
+            )).strip()
+            if cancel.is_set():
+                return {}
+            if not self.structured_output:
+                return {**self._parse_email(result), 'model': model}
 
-Format as:
-SUBJECT: [subject line]
-BODY:
-[email body]"""
+            content = self._parse_structured_email(
+                result,
+                lambda repair_prompt: self._generate_with_model(
+                    repair_prompt,
+                    model,
+                    temperature=0.0,
+                    options=options,
+                    task='cold_email_candidate',
+                    response_format=response_format,
+                ),
+            )
+            return {**content, 'model': model}
 
-        temperature_value = temperature if temperature is not None else 0.8
-        models_to_use = models or [self.model, *self.fallback_models]
-        candidates: List[Dict[str, str]] = []
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        executor = ThreadPoolExecutor(max_workers=len(models_to_use), thread_name_prefix='ollama-candidate')
+        futures = {executor.submit(generate, model): index for index, model in enumerate(models_to_use)}
+        pending = set(futures)
+        collected: Dict[int, Dict[str, str]] = {}
+        accepted = 0
 
-        for model in models_to_use:
-            try:
-                result = self._generate_with_model(
-                    prompt,
-                    model,
-                    system_prompt,
-                    temperature_value,
-                )
+        try:
+            while pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.logger.warning(
+                        f"Candidate deadline reached with {len(pending)} model(s) still generating"
+                    )
+                    break
 
-                parts = result.split('BODY:', 1)
-                subject = parts[0].replace('SUBJECT:', '').strip()
-                body = parts[1].strip() if len(parts) > 1 else result
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model = models_to_use[futures[future]]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Ollama candidate generation failed (model={model}): {e}")
+                        continue
 
-                if subject or body:
-                    candidates.append({
-                        'subject': subject,
-                        'body': body,
-                        'model': model,
-                    })
-            except Exception as e:
-                self.logger.error(f"Ollama candidate generation failed (model={model}): {e}")
+                    if content.get('subject') or content.get('body'):
+                        collected[futures[future]] = content
+                        if accept is None or accept(content):
+                            accepted += 1
+
+                if first_k and accepted >= first_k:
+                    break
+        finally:
+            # Stragglers notice the event on their next token and hang up
+            cancel.set()
+            executor.shutdown(wait=False)
 
-        return candidates
+        return [collected[index] for index in sorted(collected)]
     
     def generate_x_post(self, topic: str = "job search") -> str:
         """Generate engaging X (Twitter) post about job search"""
@@ -192,9 +908,9 @@ BODY:
 Include relevant hashtags like #JobSearch #Hiring #TechJobs #OpenToWork
 Keep it authentic, professional, and engaging."""
         
-        return self._generate(prompt, system_prompt, temperature=0.9)
+        return self._generate(prompt, system_prompt, task='x_post')
     
-    def generate_cover_letter(self, job_info: Dict) -> str:
+    def generate_cover_letter(self, job_info: Dict, max_chars: Optional[int] = None) -> str:
         """Generate tailored cover letter for job application"""
         system_prompt = """You are a professional resume and cover letter writer. 
         Create compelling, tailored cover letters that highlight relevant skills and experience."""
@@ -211,24 +927,37 @@ My Education: {job_info.get('my_education', '')}
 
 Generate a professional cover letter (250-400 words)."""
         
-        return self._generate(prompt, system_prompt, temperature=0.7)
+        return self._generate(prompt, system_prompt, max_chars=max_chars, task='cover_letter')
     
     def personalize_template(self, template: str, variables: Dict) -> str:
-        """Use AI to personalize a template with provided variables"""
+        """Personalize a template with provided variables
+
+        {placeholders} are filled locally. The AI is only called when the
+        template has [[...]] rewrite sections or placeholders the variables
+        cannot fill.
+        """
+        compiled = compile_template(template)
+        rendered, unresolved = compiled.render(variables)
+        if not compiled.has_ai_sections and not unresolved:
+            return rendered
+
         system_prompt = """You are helping personalize message templates. 
         Fill in the template naturally and ensure it flows well."""
         
         prompt = f"""Personalize this template with the following information:
 
 Template:
-{template}
+{rendered}
 
 Variables:
 {variables}
 
+Rewrite the text inside [[ ]] (dropping the brackets) and fill any remaining {{placeholders}}.
+Keep all other text exactly as written.
+
 Generate the final personalized message."""
         
-        return self._generate(prompt, system_prompt, temperature=0.6)
+        return self._generate(prompt, system_prompt, task='personalize_template')
     
     def improve_text(self, text: str, context: str = "professional message") -> str:
         """Improve existing text for better clarity and professionalism"""
@@ -241,25 +970,126 @@ Generate the final personalized message."""
 
 Make it more professional, clear, and impactful while keeping the same core message."""
         
-        return self._generate(prompt, system_prompt, temperature=0.6)
+        return self._generate(prompt, system_prompt, task='improve_text')
     
-    def check_model_availability(self) -> bool:
-        """Check if Ollama is running and model is available"""
+    def get_metrics(self) -> Dict:
+        """Return latency and throughput aggregates per task and model"""
+        return self.metrics.get_metrics()
+
+    def get_metrics_since(self, since: float) -> Dict:
+        """Aggregates over the runs logged since ``since`` (epoch seconds) plus this run"""
+        metrics = OllamaMetrics(self.metrics.max_samples)
         try:
-            url = f"{self.base_url}/api/tags"
-            response = requests.get(url, timeout=5)
+            metrics.load(self.metrics_log, since)
+        except OSError as e:
+            self.logger.warning(f"Failed to read Ollama metrics from {self.metrics_log}: {e}")
+        metrics.merge(self.metrics)
+        return metrics.get_metrics()
+
+    def get_stats(self) -> Dict:
+        """Return AI engine statistics"""
+        return {
+            'cache': self.cache.get_stats() if self.cache else {'enabled': False},
+            'models': self.router.get_stats(),
+            'endpoints': self.endpoints.get_stats(),
+            'coalescing': self.single_flight.get_stats(),
+            'retries': self.retry_policy.get_stats(),
+            'structured_output': dict(self.structured_stats),
+            'model_status': self.model_status
+        }
+    
+    def _matches_model(self, name: str, model: str) -> bool:
+        """Ollama reports untagged models as name:latest"""
+        return name == model or (':' not in model and name == f"{model}:latest")
+
+    def warm_up(self, models: Optional[List[str]] = None) -> Dict[str, float]:
+        """Preload models into memory and pin them for keep_alive
+
+        Returns the load time in seconds for every model that warmed up.
+        """
+        models = models or [self.model, *self.fallback_models]
+        timings: Dict[str, float] = {}
+
+        # Every endpoint loads its own copy; report the slowest load per model
+        for base_url in self.endpoints.urls:
+            for model in models:
+                # A request without a prompt only loads the model
+                payload = {"model": model, "stream": False}
+                if self.keep_alive is not None:
+                    payload["keep_alive"] = self.keep_alive
+
+                started = time.monotonic()
+                try:
+                    response = self.session.post(f"{base_url}/api/generate", json=payload, timeout=self.timeout)
+                    response.raise_for_status()
+                except Exception as e:
+                    self.logger.warning(f"Warm-up failed for model {model} on {base_url}: {e}")
+                    continue
+
+                elapsed = round(time.monotonic() - started, 3)
+                timings[model] = max(elapsed, timings.get(model, 0.0))
+                self.logger.info(
+                    f"Model {model} warmed up on {base_url} in {elapsed}s (keep_alive={self.keep_alive})"
+                )
+
+        self.model_status['warm_up_seconds'].update(timings)
+        return timings
+
+    def probe_recovery(self, force: bool = False) -> bool:
+        """Check whether Ollama is usable again, at most once per recovery_probe_interval"""
+        now = time.monotonic()
+        if not force and now - self._last_recovery_probe < self.recovery_probe_interval:
+            return False
+        self._last_recovery_probe = now
+        return self.check_model_availability()
+
+    def get_model_status(self) -> Dict:
+        """Return installed/resident models and warm-up timings from the last checks"""
+        return self.model_status
+
+    def _check_endpoint(self, base_url: str) -> bool:
+        """Check one Ollama server and record its installed and resident models"""
+        try:
+            response = self.session.get(f"{base_url}/api/tags", timeout=(self.connect_timeout, 5))
             response.raise_for_status()
-            
-            models = response.json().get('models', [])
-            model_names = [m.get('name', '') for m in models]
-            
-            if self.model in model_names:
-                self.logger.info(f"Model {self.model} is available")
-                return True
-            else:
-                self.logger.warning(f"Model {self.model} not found. Available: {model_names}")
-                return False
-        
+            model_names = [m.get('name', '') for m in response.json().get('models', [])]
         except Exception as e:
-            self.logger.error(f"Failed to connect to Ollama: {e}")
+            self.logger.error(f"Failed to connect to Ollama at {base_url}: {e}")
             return False
+
+        available = self.model_status['available']
+        available.extend(name for name in model_names if name not in available)
+
+        try:
+            response = self.session.get(f"{base_url}/api/ps", timeout=(self.connect_timeout, 5))
+            response.raise_for_status()
+            resident = [m.get('name', '') for m in response.json().get('models', [])]
+            known = self.model_status['resident']
+            known.extend(name for name in resident if name not in known)
+            self.logger.info(f"Resident models on {base_url}: {resident or 'none'}")
+        except Exception as e:
+            self.logger.warning(f"Could not list resident models on {base_url}: {e}")
+
+        if any(self._matches_model(name, self.model) for name in model_names):
+            return True
+        self.logger.warning(f"Model {self.model} not found on {base_url}. Available: {model_names}")
+        return False
+
+    def check_model_availability(self) -> bool:
+        """Check if Ollama is running and model is available
+
+        Every configured endpoint is checked; endpoints that are down or
+        missing the model are drained until they pass a later check.
+        """
+        self.model_status['available'] = []
+        self.model_status['resident'] = []
+        results = self.endpoints.check_all()
+
+        if self.model_status['warm_up_seconds']:
+            self.logger.info(f"Warm-up timings: {self.model_status['warm_up_seconds']}")
+
+        healthy = [url for url, ok in results.items() if ok]
+        if healthy:
+            self.logger.info(f"Model {self.model} is available on {len(healthy)}/{len(results)} endpoint(s)")
+            return True
+        return False
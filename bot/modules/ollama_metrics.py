@@ -0,0 +1,155 @@
+"""
+Ollama Metrics
+Collects per-call timing and token counts reported by Ollama
+"""
+
+import json
+import statistics
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+NANOSECONDS = 1_000_000_000
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 30, 60, 120]
+TOKENS_PER_SEC_BUCKETS = [1, 2, 5, 10, 20, 50, 100]
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return round(ordered[index], 3)
+
+
+def _histogram(values: List[float], buckets: List[float]) -> Dict[str, int]:
+    counts = {f"<={bound}": 0 for bound in buckets}
+    counts[f">{buckets[-1]}"] = 0
+    for value in values:
+        for bound in buckets:
+            if value <= bound:
+                counts[f"<={bound}"] += 1
+                break
+        else:
+            counts[f">{buckets[-1]}"] += 1
+    return counts
+
+
+class OllamaMetrics:
+    """Per task/model latency and throughput samples with p50/p95 aggregates"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[tuple, deque] = {}
+        self._errors: Dict[tuple, int] = {}
+
+    def record(self, task: Optional[str], model: str, latency: float, data: Optional[Dict] = None):
+        """Record one completed call; data is Ollama's final response object"""
+        data = data or {}
+        eval_count = data.get('eval_count') or 0
+        eval_duration = data.get('eval_duration') or 0
+
+        sample = {
+            'latency': latency,
+            'eval_count': eval_count,
+            'prompt_eval_count': data.get('prompt_eval_count') or 0,
+            'prompt_eval_seconds': (data.get('prompt_eval_duration') or 0) / NANOSECONDS,
+            'load_seconds': (data.get('load_duration') or 0) / NANOSECONDS,
+            'tokens_per_sec': eval_count / (eval_duration / NANOSECONDS) if eval_duration else None,
+        }
+
+        key = (task or 'generic', model)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.max_samples)
+            self._samples[key].append(sample)
+
+    def record_error(self, task: Optional[str], model: str):
+        key = (task or 'generic', model)
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def _entries(self) -> List[Dict]:
+        with self._lock:
+            keys = set(self._samples) | set(self._errors)
+            return [
+                {
+                    'task': task,
+                    'model': model,
+                    'samples': list(self._samples.get((task, model), [])),
+                    'errors': self._errors.get((task, model), 0)
+                }
+                for task, model in sorted(keys)
+            ]
+
+    def _add_entries(self, entries: List[Dict]):
+        with self._lock:
+            for entry in entries:
+                key = (entry['task'], entry['model'])
+                if key not in self._samples:
+                    self._samples[key] = deque(maxlen=self.max_samples)
+                self._samples[key].extend(entry.get('samples', []))
+                self._errors[key] = self._errors.get(key, 0) + entry.get('errors', 0)
+
+    def merge(self, other: 'OllamaMetrics'):
+        """Add another collector's samples and errors to this one"""
+        self._add_entries(other._entries())
+
+    def save(self, path: Path) -> bool:
+        """Append this run's samples to a JSON-lines log; False if there was nothing to write"""
+        entries = self._entries()
+        if not entries:
+            return False
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'timestamp': time.time(), 'metrics': entries}) + '\n')
+        return True
+
+    def load(self, path: Path, since: float = 0):
+        """Add the samples of runs logged by ``save`` at or after ``since``"""
+        path = Path(path)
+        if not path.exists():
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue  # a run cut off mid-write
+                if run.get('timestamp', 0) >= since:
+                    self._add_entries(run.get('metrics', []))
+
+    def get_metrics(self) -> Dict:
+        """Aggregate samples per task and model"""
+        with self._lock:
+            keys = set(self._samples) | set(self._errors)
+            snapshot = {key: list(self._samples.get(key, [])) for key in keys}
+            errors = dict(self._errors)
+
+        metrics: Dict[str, Dict] = {}
+        for (task, model), samples in sorted(snapshot.items()):
+            latencies = [s['latency'] for s in samples]
+            throughput = [s['tokens_per_sec'] for s in samples if s['tokens_per_sec']]
+            metrics.setdefault(task, {})[model] = {
+                'calls': len(samples),
+                'errors': errors.get((task, model), 0),
+                'latency_p50': _percentile(latencies, 50),
+                'latency_p95': _percentile(latencies, 95),
+                'tokens_per_sec_p50': _percentile(throughput, 50),
+                'tokens_per_sec_p95': _percentile(throughput, 95),
+                'avg_eval_tokens': round(statistics.mean(s['eval_count'] for s in samples), 1) if samples else 0,
+                'avg_prompt_tokens': round(statistics.mean(s['prompt_eval_count'] for s in samples), 1) if samples else 0,
+                'avg_prompt_eval_seconds': round(statistics.mean(s['prompt_eval_seconds'] for s in samples), 3) if samples else 0,
+                'total_load_seconds': round(sum(s['load_seconds'] for s in samples), 3),
+                'latency_histogram': _histogram(latencies, LATENCY_BUCKETS),
+                'tokens_per_sec_histogram': _histogram(throughput, TOKENS_PER_SEC_BUCKETS),
+            }
+
+        return metrics
@@ -0,0 +1,289 @@
+"""
+Recipient Model
+Compact recipient records with interned tags and packed extra columns
+"""
+
+import threading
+from collections.abc import MutableMapping
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+FIELDS = ('email', 'name', 'company', 'position_type', 'source')
+CORE_KEYS = (*FIELDS, 'tags')
+
+
+class TagVocabulary:
+    """Interns tag strings to small integer IDs shared by every recipient"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, tag: str) -> int:
+        tag_id = self._ids.get(tag)
+        if tag_id is None:
+            with self._lock:
+                tag_id = self._ids.get(tag)
+                if tag_id is None:
+                    tag_id = len(self._names)
+                    self._names.append(tag)
+                    self._ids[tag] = tag_id
+        return tag_id
+
+    def name(self, tag_id: int) -> str:
+        return self._names[tag_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+TAGS = TagVocabulary()
+
+def parse_tags(tags: object) -> Tuple[int, ...]:
+    """Tag IDs for a comma-separated string or a list, in first-seen order"""
+    if isinstance(tags, str):
+        return _parse_tag_string(tags)
+    if isinstance(tags, (list, tuple, set)):
+        return _intern_tags(str(tag) for tag in tags)
+    return ()
+
+
+@lru_cache(maxsize=4096)
+def _parse_tag_string(tags: str) -> Tuple[int, ...]:
+    # Sources repeat a handful of tag strings; IDs never change once interned
+    return _intern_tags(tags.split(','))
+
+
+def _intern_tags(names: Iterable[str]) -> Tuple[int, ...]:
+    tag_ids = []
+    for name in names:
+        name = name.strip()
+        if name:
+            tag_id = TAGS.intern(name)
+            if tag_id not in tag_ids:
+                tag_ids.append(tag_id)
+    return tuple(tag_ids)
+
+
+class Recipient(MutableMapping):
+    """One recipient, usable anywhere a recipient dict was.
+
+    The fields the bot reads (``FIELDS`` plus ``tags``) live in slots and
+    tags are kept as interned IDs. Other columns are packed as a key tuple
+    plus a value tuple and only unpacked into a dict when one of them is
+    written. Loaders pass ``extra_keys`` (see ``extra_keys_for``) so every
+    row of a source shares its header's tuple; None and empty values in
+    it count as missing. Reading ``tags`` returns the familiar comma-separated
+    string.
+    """
+
+    __slots__ = ('email', 'name', 'company', 'position_type', 'source', 'tag_ids',
+                 '_extra_keys', '_extra_values', '_extras')
+
+    def __init__(
+        self,
+        row: Optional[Dict] = None,
+        extra_keys: Optional[Tuple[str, ...]] = None,
+        **fields,
+    ):
+        row = {**row, **fields} if fields else (row or {})
+        get = row.get
+        self.email = get('email')
+        self.name = get('name')
+        self.company = get('company')
+        self.position_type = get('position_type')
+        self.source = get('source')
+        tags = get('tags')
+        self.tag_ids: Optional[Tuple[int, ...]] = None if tags is None else parse_tags(tags)
+        self._extra_keys: Tuple[str, ...] = ()
+        self._extra_values: Tuple[Optional[str], ...] = ()
+        self._extras: Optional[Dict[str, object]] = None
+
+        if extra_keys is not None:
+            self._extra_keys = extra_keys
+            self._extra_values = tuple(map(get, extra_keys))
+            if len(row) > len(extra_keys) + len(row.keys() & CORE_KEYS):
+                # Columns the shared header does not know about
+                for key, value in row.items():
+                    if key not in CORE_KEYS and key not in extra_keys and value is not None and value != '':
+                        self._unpack_extras()[key] = value
+            return
+
+        pairs = [
+            (key, value) for key, value in row.items()
+            if key not in CORE_KEYS and value is not None and value != ''
+        ]
+        if pairs:
+            self._extra_keys = tuple(key for key, _ in pairs)
+            self._extra_values = tuple(value for _, value in pairs)
+
+    @staticmethod
+    def extra_keys_for(row: Dict) -> Tuple[str, ...]:
+        """The non-core columns of a row, to share across rows with the same header"""
+        return tuple(key for key in row if key not in CORE_KEYS)
+
+    @property
+    def tags(self) -> List[str]:
+        return [TAGS.name(tag_id) for tag_id in self.tag_ids or ()]
+
+    def _unpack_extras(self) -> Dict[str, object]:
+        if self._extras is None:
+            self._extras = {
+                key: value for key, value in zip(self._extra_keys, self._extra_values)
+                if value is not None and value != ''
+            }
+            self._extra_keys = ()
+            self._extra_values = ()
+        return self._extras
+
+    def _iter_extras(self) -> Iterable[Tuple[str, object]]:
+        if self._extras is not None:
+            return self._extras.items()
+        return (
+            (key, value) for key, value in zip(self._extra_keys, self._extra_values)
+            if value is not None and value != ''
+        )
+
+    def __getitem__(self, key: str):
+        if key in FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if key == 'tags':
+            if self.tag_ids is None:
+                raise KeyError(key)
+            return ", ".join(self.tags)
+        if self._extras is not None:
+            return self._extras[key]
+        try:
+            value = self._extra_values[self._extra_keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+        if value is None or value == '':
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        if key in FIELDS:
+            setattr(self, key, value)
+        elif key == 'tags':
+            self.tag_ids = None if value is None else parse_tags(value)
+        else:
+            self._unpack_extras()[key] = value
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        if key in FIELDS:
+            setattr(self, key, None)
+        elif key == 'tags':
+            self.tag_ids = None
+        else:
+            del self._unpack_extras()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for field in FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        if self.tag_ids is not None:
+            yield 'tags'
+        for key, _ in self._iter_extras():
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key) -> bool:
+        if key in FIELDS:
+            return getattr(self, key) is not None
+        if key == 'tags':
+            return self.tag_ids is not None
+        return any(extra == key for extra, _ in self._iter_extras())
+
+    def to_dict(self) -> Dict[str, object]:
+        """Plain dict copy, read straight from the slots and extras"""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.tag_ids is not None:
+            data['tags'] = ", ".join(self.tags)
+        if self._extras is not None:
+            data.update(self._extras)
+        else:
+            for key, value in zip(self._extra_keys, self._extra_values):
+                if value is not None and value != '':
+                    data[key] = value
+        return data
+
+    # The Mapping defaults look every key up again through __getitem__
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def values(self) -> List[object]:
+        return list(self.to_dict().values())
+
+    def items(self) -> List[Tuple[str, object]]:
+        return list(self.to_dict().items())
+
+    def __repr__(self) -> str:
+        return f"Recipient({self.to_dict()!r})"
+
+
+def recipients_from_rows(rows: Iterable[Dict]) -> Iterator[Recipient]:
+    """Recipients for rows of one CSV, sharing the key tuple of its header"""
+    extra_keys = None
+    for row in rows:
+        if extra_keys is None:
+            extra_keys = Recipient.extra_keys_for(row)
+        yield Recipient(row, extra_keys)
+
+
+class ColumnLoader:
+    """Builds recipients straight from column-wise values, without a dict per row.
+
+    ``names`` are the columns of one source; ``build`` takes one list per
+    column with None where a row has no value. The key tuple and parsed
+    tags are shared by every block built by the same loader.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        self.extra_keys = Recipient.extra_keys_for(self.names)
+        self._tag_ids: Dict[str, Tuple[int, ...]] = {}
+
+    def _parse_tags(self, tags: Optional[str]) -> Optional[Tuple[int, ...]]:
+        if tags is None:
+            return None
+        tag_ids = self._tag_ids.get(tags)
+        if tag_ids is None:
+            tag_ids = self._tag_ids[tags] = parse_tags(tags)
+        return tag_ids
+
+    def build(self, columns: List[List[Optional[str]]]) -> Iterator[Recipient]:
+        by_name = dict(zip(self.names, columns))
+        rows = len(columns[0]) if columns else 0
+        core = [by_name[field] if field in by_name else repeat(None, rows) for field in FIELDS]
+        tags = map(self._parse_tags, by_name['tags']) if 'tags' in by_name else repeat(None, rows)
+        extras = zip(*(by_name[key] for key in self.extra_keys))
+        if not self.extra_keys:
+            extras = repeat((), rows)
+
+        extra_keys = self.extra_keys
+        new = Recipient.__new__
+        for email, name, company, position_type, source, tag_ids, values in zip(*core, tags, extras):
+            recipient = new(Recipient)
+            recipient.email = email
+            recipient.name = name
+            recipient.company = company
+            recipient.position_type = position_type
+            recipient.source = source
+            recipient.tag_ids = tag_ids
+            recipient._extra_keys = extra_keys
+            recipient._extra_values = values
+            recipient._extras = None
+            yield recipient
@@ -0,0 +1,358 @@
+"""
+Recipient Cache
+Compiled, memory-mapped columnar copies of recipient CSVs
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from .recipient import ColumnLoader, Recipient, recipients_from_rows
+
+MAGIC = b'RCC3'
+VERSION = 3
+BLOCK_ROWS = 4096
+HASH_CHUNK = 1024 * 1024
+# Values within a block are separated by SEPARATOR; NULL stands for a missing value
+SEPARATOR = '\0'
+NULL = '\x01'
+
+
+class _CompiledFile:
+    """Read-only view of one compiled cache file"""
+
+    def __init__(self, path: Path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mm[:4] != MAGIC:
+                raise ValueError("not a recipient cache file")
+            (header_len,) = struct.unpack_from('<I', self._mm, 4)
+            self.header = json.loads(self._mm[8:8 + header_len])
+            if self.header.get('version') != VERSION:
+                raise ValueError("unsupported cache version")
+        except Exception:
+            self._mm.close()
+            raise
+
+        self.rows = self.header['rows']
+        self.data_start = 8 + header_len
+        self.columns = self.header['columns']
+
+    def release_pages(self):
+        """Drop mapped pages already read from this process's resident set"""
+        if hasattr(mmap, 'MADV_DONTNEED'):
+            self._mm.madvise(mmap.MADV_DONTNEED)
+
+    def raw(self, column: Dict, start: int, stop: int) -> bytes:
+        """Encoded bytes of one column from block ``start`` up to block ``stop``"""
+        blocks = column['blocks']
+        at = self.data_start + column['at']
+        return self._mm[at + blocks[start]:at + blocks[stop]]
+
+    def block(self, column: Dict, index: int) -> List[Optional[str]]:
+        values = self.raw(column, index, index + 1).decode('utf-8').split(SEPARATOR)
+        if NULL in values:
+            values = [None if value == NULL else value for value in values]
+        return values
+
+    def __iter__(self) -> Iterator[Recipient]:
+        loader = ColumnLoader([column['name'] for column in self.columns])
+        for index in range(len(self.columns[0]['blocks']) - 1 if self.columns else 0):
+            columns = [self.block(column, index) for column in self.columns]
+            self.release_pages()
+            yield from loader.build(columns)
+
+    def close(self):
+        self._mm.close()
+
+
+class _ColumnWriter:
+    """Streams one column's encoded blocks to a temporary file"""
+
+    def __init__(self, directory: Path, null_rows: int = 0):
+        self.blob = tempfile.TemporaryFile(dir=directory)
+        self.blocks = [0]
+        self._values: List[str] = []
+        for _ in range(null_rows):
+            self.add(None)
+
+    @classmethod
+    def copy_of(cls, directory: Path, compiled: _CompiledFile, column: Dict) -> '_ColumnWriter':
+        """Copy full blocks byte for byte and re-add the values of a trailing partial block"""
+        writer = cls(directory)
+        full = compiled.rows // BLOCK_ROWS
+        writer.blob.write(compiled.raw(column, 0, full))
+        writer.blocks = column['blocks'][:full + 1]
+        if compiled.rows % BLOCK_ROWS:
+            for value in compiled.block(column, full):
+                writer.add(value)
+        return writer
+
+    def add(self, value):
+        if value is None:
+            value = NULL
+        else:
+            value = str(value)
+            if SEPARATOR in value or value == NULL:
+                raise ValueError("value contains a control character the cache cannot store")
+        self._values.append(value)
+        if len(self._values) >= BLOCK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self._values:
+            return
+        data = SEPARATOR.join(self._values).encode('utf-8')
+        self.blob.write(data)
+        self.blocks.append(self.blocks[-1] + len(data))
+        self._values = []
+
+    def close(self):
+        self.blob.close()
+
+
+class _Compiler:
+    """Builds a compiled file row by row without holding the rows in memory"""
+
+    def __init__(self, directory: Path, compiled: Optional[_CompiledFile] = None):
+        self.directory = directory
+        self.rows = 0
+        self.columns: Dict[str, _ColumnWriter] = {}
+        if compiled is not None:
+            # Existing full blocks are copied as-is; new rows go after them
+            for column in compiled.columns:
+                self.columns[column['name']] = _ColumnWriter.copy_of(directory, compiled, column)
+                compiled.release_pages()
+            self.rows = compiled.rows
+
+    def add(self, row: Dict):
+        for name, writer in self.columns.items():
+            writer.add(row.get(name))
+        for name, value in row.items():
+            if name not in self.columns:
+                self.columns[name] = _ColumnWriter(self.directory, self.rows)
+                self.columns[name].add(value)
+        self.rows += 1
+
+    def write(self, target: IO[bytes], header: Dict):
+        columns = []
+        position = 0
+        for name, writer in self.columns.items():
+            writer.flush()
+            columns.append({'name': name, 'at': position, 'blocks': writer.blocks})
+            position += writer.blocks[-1]
+
+        # Column positions are relative to the end of the header
+        header_bytes = json.dumps({**header, 'version': VERSION, 'rows': self.rows, 'columns': columns}).encode('utf-8')
+        target.write(MAGIC)
+        target.write(struct.pack('<I', len(header_bytes)))
+        target.write(header_bytes)
+        for writer in self.columns.values():
+            writer.blob.seek(0)
+            shutil.copyfileobj(writer.blob, target)
+
+    def close(self):
+        for writer in self.columns.values():
+            writer.close()
+
+
+class RecipientCache:
+    """Per-source compiled recipients, validated by a hash of the parsed bytes.
+
+    A compiled file stores each field as a column of 4096-row blocks
+    (values joined by NUL, with a marker for missing ones) and is
+    memory-mapped when read. Unchanged sources skip CSV parsing and
+    per-row processing: each block is decoded and split in one call per
+    column and recipients are built straight from the columns.
+
+    The cache records the SHA-256 of every source byte it has parsed and
+    re-hashes that prefix on each load. When it still matches, only
+    complete lines after it are parsed and appended; any other change
+    rebuilds that source's file. If the cache cannot be read or written,
+    recipients are parsed from the CSV directly.
+    """
+
+    def __init__(self, config: Dict):
+        bot_dir = Path(__file__).resolve().parent.parent
+        self.directory = Path(config.get('path') or 'logs/recipient_cache').expanduser()
+        if not self.directory.is_absolute():
+            self.directory = bot_dir / self.directory
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'hits': 0,
+            'appends': 0,
+            'rebuilds': 0,
+            'errors': 0
+        }
+        self._lock = threading.Lock()
+
+    def _cache_path(self, source_path: Path, source: str) -> Path:
+        digest = hashlib.sha1(f"{source_path.resolve()}\n{source}".encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}.rcc"
+
+    @staticmethod
+    def _prefix_hash(f, end: int):
+        """Running SHA-256 of the first ``end`` bytes of the source"""
+        digest = hashlib.sha256()
+        f.seek(0)
+        remaining = end
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        return digest
+
+    def _open(self, cache_path: Path) -> Optional[_CompiledFile]:
+        if not cache_path.exists():
+            return None
+        try:
+            return _CompiledFile(cache_path)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable recipient cache {cache_path.name}: {e}")
+            return None
+
+    @staticmethod
+    def _complete_lines(f, consumed: List[int], digest) -> Iterator[str]:
+        """Decoded newline-terminated lines, counted in ``consumed[0]`` and added to ``digest``"""
+        for line in f:
+            if not line.endswith(b'\n'):
+                return
+            consumed[0] += len(line)
+            digest.update(line)
+            yield line.decode('utf-8')
+
+    def _compile(self, f, source_path: Path, cache_path: Path, compiled: Optional[_CompiledFile],
+                 digest, process: Callable[[Dict], Optional[Dict]]) -> int:
+        """Write a refreshed cache file; returns how many bytes of the source it covers"""
+        header = compiled.header if compiled else {}
+        start = header.get('parsed_bytes', 0)
+        fieldnames = header.get('fieldnames') or None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix('.tmp')
+        compiler = _Compiler(self.directory, compiled)
+        try:
+            consumed = [0]
+            f.seek(start)
+            reader = csv.DictReader(self._complete_lines(f, consumed, digest), fieldnames=fieldnames)
+            added = 0
+            for row in reader:
+                row.pop(None, None)
+                processed = process(row)
+                if processed is not None:
+                    compiler.add(processed)
+                    added += 1
+
+            parsed_bytes = start + consumed[0]
+            with open(temp_path, 'wb') as target:
+                compiler.write(target, {
+                    'source': str(source_path),
+                    'parsed_bytes': parsed_bytes,
+                    'sha256': digest.hexdigest(),
+                    'fieldnames': list(reader.fieldnames or fieldnames or []),
+                })
+        except BaseException:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+        finally:
+            compiler.close()
+
+        if compiled:
+            compiled.close()
+        os.replace(temp_path, cache_path)
+        if compiled:
+            self.stats['appends'] += 1
+            self.logger.info(f"Recipient cache: {added} appended rows parsed from {source_path}")
+        else:
+            self.stats['rebuilds'] += 1
+            self.logger.info(f"Recipient cache: compiled {added} rows from {source_path}")
+        return parsed_bytes
+
+    def _refresh(self, source_path: Path, source: str,
+                 process: Callable[[Dict], Optional[Dict]]) -> Tuple[_CompiledFile, bytes]:
+        """Open an up-to-date compiled file and the unterminated tail it does not cover"""
+        cache_path = self._cache_path(source_path, source)
+        with self._lock, open(source_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            compiled = self._open(cache_path)
+            digest = None
+            if compiled:
+                parsed_bytes = compiled.header.get('parsed_bytes', 0)
+                if parsed_bytes <= size:
+                    digest = self._prefix_hash(f, parsed_bytes)
+                    if digest.hexdigest() != compiled.header.get('sha256'):
+                        digest = None
+                if digest is None:
+                    compiled.close()
+                    compiled = None
+
+            if compiled:
+                # Prefix intact: a hit, unless complete lines were appended after it
+                f.seek(compiled.header['parsed_bytes'])
+                if b'\n' not in f.read():
+                    self.stats['hits'] += 1
+                    f.seek(compiled.header['parsed_bytes'])
+                    return compiled, f.read()
+
+            try:
+                parsed_bytes = self._compile(f, source_path, cache_path, compiled,
+                                             digest or hashlib.sha256(), process)
+            except BaseException:
+                if compiled:
+                    compiled.close()
+                raise
+            compiled = _CompiledFile(cache_path)
+            f.seek(parsed_bytes)
+            return compiled, f.read()
+
+    def iter_recipients(self, source_path: Path, source: str,
+                        process: Callable[[Dict], Optional[Dict]]) -> Iterator[Recipient]:
+        """Yield the recipients of a CSV, compiling or refreshing its cache as needed
+
+        ``process`` turns a raw CSV row into a recipient row (or None to
+        skip it); it must depend only on the row so cached results stay
+        valid.
+        """
+        source_path = Path(source_path)
+        try:
+            compiled, tail = self._refresh(source_path, source, process)
+        except (OSError, ValueError, csv.Error) as e:
+            self.stats['errors'] += 1
+            self.logger.warning(f"Recipient cache unavailable for {source_path}, parsing the CSV directly: {e}")
+            with open(source_path, 'r', encoding='utf-8', newline='') as f:
+                yield from recipients_from_rows(self._processed(csv.DictReader(f), process))
+            return
+
+        fieldnames = compiled.header['fieldnames'] or None
+        try:
+            yield from compiled
+        finally:
+            compiled.close()
+
+        if tail:
+            rows = csv.DictReader(tail.decode('utf-8').splitlines(), fieldnames=fieldnames)
+            yield from recipients_from_rows(self._processed(rows, process))
+
+    @staticmethod
+    def _processed(rows: Iterator[Dict], process: Callable[[Dict], Optional[Dict]]) -> Iterator[Dict]:
+        for row in rows:
+            row.pop(None, None)
+            processed = process(row)
+            if processed is not None:
+                yield processed
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,122 @@
+"""
+Retry Policy
+Retries transient Ollama failures with exponential backoff, jitter and a deadline
+"""
+
+import logging
+import random
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when a task's overall deadline runs out"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by a per-task deadline.
+
+    Attempt ``n`` (starting at 1) sleeps a random time up to
+    ``min(max_delay, base_delay * multiplier ** (n - 1))`` before retrying.
+    Only transient errors are retried: connection errors, connect timeouts,
+    HTTP 429 and 5xx responses. A read timeout means the model is hanging,
+    so it is not retried unless ``retry_read_timeouts`` is set. No retry is
+    started once the deadline (or the caller's ``retry_until``) would pass.
+    """
+
+    def __init__(self, config: Dict):
+        self.max_attempts = max(1, int(config.get('max_attempts', 3)))
+        self.base_delay = float(config.get('base_delay', 1.0))
+        self.max_delay = float(config.get('max_delay', 30.0))
+        self.multiplier = float(config.get('multiplier', 2.0))
+        self.jitter = bool(config.get('jitter', True))
+        self.retry_read_timeouts = bool(config.get('retry_read_timeouts', False))
+        self.deadline_seconds = float(config.get('deadline_seconds', 180))
+        self.task_deadlines = {
+            str(task): float(seconds) for task, seconds in (config.get('task_deadlines', {}) or {}).items()
+        }
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'retries': 0,
+            'deadline_exceeded': 0
+        }
+
+    def deadline_for(self, task: Optional[str]) -> Optional[float]:
+        """Absolute (monotonic) deadline for a task, or None for no deadline"""
+        seconds = self.task_deadlines.get(task or '', self.deadline_seconds)
+        if not seconds or seconds <= 0:
+            return None
+        return time.monotonic() + seconds
+
+    @staticmethod
+    def is_read_timeout(error: Exception) -> bool:
+        """True for a read timeout, including one raised while reading a stream"""
+        if isinstance(error, requests.ReadTimeout):
+            return True
+        return isinstance(error, requests.ConnectionError) and any(
+            isinstance(arg, ReadTimeoutError) for arg in error.args
+        )
+
+    def is_transient(self, error: Exception) -> bool:
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if self.is_read_timeout(error) and not self.retry_read_timeouts:
+            return False
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        if isinstance(error, requests.HTTPError) and response is not None:
+            return response.status_code == 429 or response.status_code >= 500
+        return False
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def check_deadline(self, deadline: Optional[float]):
+        if deadline is not None and time.monotonic() >= deadline:
+            self.stats['deadline_exceeded'] += 1
+            raise DeadlineExceeded("Ollama task deadline exceeded")
+
+    def call(
+        self,
+        func: Callable,
+        deadline: Optional[float] = None,
+        description: str = 'Ollama request',
+        retry_until: Optional[float] = None,
+        can_retry: Optional[Callable[[], bool]] = None,
+    ):
+        """Run func, retrying transient failures until attempts or the deadline run out
+
+        ``retry_until`` (monotonic) stops retries earlier than ``deadline``
+        and ``can_retry`` is consulted before each retry, so callers can
+        keep time for fallbacks or stop once a circuit opens.
+        """
+        retry_until = min(t for t in (deadline, retry_until, float('inf')) if t is not None)
+        attempt = 1
+        while True:
+            self.check_deadline(deadline)
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_transient(e):
+                    raise
+                if can_retry is not None and not can_retry():
+                    raise
+
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= retry_until:
+                    raise
+
+                self.stats['retries'] += 1
+                self.logger.warning(
+                    f"{description} failed ({e}); retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
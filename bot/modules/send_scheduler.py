@@ -0,0 +1,168 @@
+"""
+Send Scheduler
+Token-bucket rate limiting for outbound email with hourly and daily caps
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+class TokenBucket:
+    """Holds up to ``capacity`` tokens, adding one every ``refill_interval`` seconds"""
+
+    def __init__(self, capacity: int, refill_interval: float):
+        self.capacity = max(1, int(capacity))
+        self.refill_interval = max(0.0, float(refill_interval))
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.refill_interval <= 0:
+            self.tokens = float(self.capacity)
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) / self.refill_interval)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.refill_interval
+
+    def consume(self) -> bool:
+        self._refill(time.monotonic())
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SendScheduler:
+    """Releases sends no faster than the bucket, hourly and daily limits allow.
+
+    ``burst`` sends may go out back to back; after that one send is
+    released per ``interval`` seconds. ``hourly_limit`` is a rolling hour
+    and ``daily_limit`` counts sends since local midnight (0 disables
+    either). Both can be seeded with earlier send times so restarts do not
+    reset them.
+    """
+
+    def __init__(self, interval: float, burst: int = 1, hourly_limit: int = 0, daily_limit: int = 0):
+        self.bucket = TokenBucket(burst, interval)
+        self.hourly_limit = max(0, int(hourly_limit or 0))
+        self.daily_limit = max(0, int(daily_limit or 0))
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._sent = deque()  # wall-clock send times from the last hour and today
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'SendScheduler':
+        return cls(
+            interval=float(config.get('delay_between_emails', 60)),
+            burst=int(config.get('email_burst', 1)),
+            hourly_limit=int(config.get('hourly_email_limit', 0) or 0),
+            daily_limit=int(config.get('daily_email_limit', 50) or 0),
+        )
+
+    def seed(self, timestamps: Iterable[float]):
+        """Count sends from earlier runs against the hourly and daily limits"""
+        with self._lock:
+            self._sent = deque(sorted([*self._sent, *timestamps]))
+            self._prune(time.time())
+
+    def _prune(self, now: float):
+        # Only the last hour and today's sends are ever counted
+        cutoff = min(now - HOUR, self._midnight(now))
+        while self._sent and self._sent[0] < cutoff:
+            self._sent.popleft()
+
+    def _window_count(self, now: float, window: float) -> int:
+        return sum(1 for ts in self._sent if now - ts < window)
+
+    @staticmethod
+    def _midnight(now: float) -> float:
+        """Start of the local calendar day containing ``now``"""
+        return datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+    def _sent_today(self, now: float) -> int:
+        midnight = self._midnight(now)
+        return sum(1 for ts in self._sent if ts >= midnight)
+
+    def remaining_today(self) -> Optional[int]:
+        """Sends left today (since local midnight), or None without a daily limit"""
+        if not self.daily_limit:
+            return None
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            return max(0, self.daily_limit - self._sent_today(now))
+
+    def wait_time(self) -> float:
+        """Seconds until the next send may go out"""
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            waits = [self.bucket.wait_time()]
+
+            if self.hourly_limit:
+                in_window = [ts for ts in self._sent if now - ts < HOUR]
+                if len(in_window) >= self.hourly_limit:
+                    # Wait until enough of the oldest sends leave the window
+                    waits.append(in_window[len(in_window) - self.hourly_limit] + HOUR - now)
+
+            if self.daily_limit and self._sent_today(now) >= self.daily_limit:
+                # The daily cap resets at the next local midnight
+                tomorrow = datetime.fromtimestamp(self._midnight(now)) + timedelta(days=1)
+                waits.append(tomorrow.timestamp() - now)
+
+            return max(0.0, *waits)
+
+    def acquire(self, idle: Optional[Callable[[float], None]] = None, max_wait: Optional[float] = None) -> bool:
+        """Block until a send slot opens and claim it.
+
+        ``idle(seconds)`` is called with the remaining wait instead of
+        sleeping, so callers can do useful work in the meantime; it should
+        return within that time. Returns False if the slot is more than
+        ``max_wait`` seconds away.
+        """
+        while True:
+            wait = self.wait_time()
+            if wait <= 0:
+                with self._lock:
+                    if self.bucket.consume():
+                        self._sent.append(time.time())
+                        return True
+                continue
+
+            if max_wait is not None and wait > max_wait:
+                return False
+
+            if idle:
+                started = time.monotonic()
+                idle(wait)
+                # Guard against idle callbacks that return immediately
+                left = wait - (time.monotonic() - started)
+                if left > 0:
+                    time.sleep(min(left, 1.0))
+            else:
+                time.sleep(wait)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            now = time.time()
+            self._prune(now)
+            return {
+                'sent_last_hour': self._window_count(now, HOUR),
+                'sent_today': self._sent_today(now),
+                'hourly_limit': self.hourly_limit,
+                'daily_limit': self.daily_limit
+            }
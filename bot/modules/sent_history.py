@@ -0,0 +1,226 @@
+"""
+Sent History
+Indexed SQLite record of every email sent, with a CSV mirror for compatibility
+"""
+
+import csv
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+DAY = 24 * 3600
+CSV_FIELDS = ['timestamp', 'recipient_email', 'recipient_name', 'subject', 'company']
+
+
+class SentHistory:
+    """Sent emails indexed by recipient, domain and time.
+
+    Sends are buffered and written ``batch_size`` at a time (and on
+    ``flush``/``close``); lookups also see the buffer. Each written batch is
+    appended to ``sent_emails.csv`` in the original format, and that CSV is
+    imported once when the database is first created, so existing logs
+    carry over.
+    """
+
+    def __init__(self, config: Dict, csv_path: Path):
+        bot_dir = Path(__file__).resolve().parent.parent
+        self.path = Path(config.get('path') or 'logs/sent_history.sqlite3').expanduser()
+        if not self.path.is_absolute():
+            self.path = bot_dir / self.path
+        self.csv_path = Path(csv_path)
+        self.batch_size = max(1, int(config.get('batch_size', 20)))
+        self.csv_mirror = bool(config.get('csv_mirror', True))
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._buffer: List[tuple] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            '''CREATE TABLE IF NOT EXISTS sent (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                email TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                name TEXT,
+                subject TEXT,
+                company TEXT,
+                campaign_id TEXT
+            )'''
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sent_email ON sent (email, timestamp)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sent_domain ON sent (domain, timestamp)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sent_timestamp ON sent (timestamp)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.commit()
+        self._import_csv()
+
+    @staticmethod
+    def _normalize(email: str) -> str:
+        return str(email or '').strip().lower()
+
+    @staticmethod
+    def _domain(email: str) -> str:
+        return email.rpartition('@')[2]
+
+    def _import_csv(self):
+        """Import the legacy CSV log the first time this database is used"""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'csv_imported'").fetchone():
+            return
+
+        rows = []
+        if self.csv_path.exists():
+            with open(self.csv_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    email = self._normalize(row.get('recipient_email'))
+                    if not email:
+                        continue
+                    try:
+                        timestamp = datetime.fromisoformat(row.get('timestamp') or '').timestamp()
+                    except ValueError:
+                        continue
+                    rows.append((timestamp, email, self._domain(email), row.get('recipient_name', ''),
+                                 row.get('subject', ''), row.get('company', ''), None))
+
+        with self._lock:
+            self._insert(rows)
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('csv_imported', ?)", (str(time.time()),))
+            self._conn.commit()
+        if rows:
+            self.logger.info(f"Imported {len(rows)} sent emails from {self.csv_path.name}")
+
+    def _insert(self, rows: List[tuple]):
+        self._conn.executemany(
+            'INSERT INTO sent (timestamp, email, domain, name, subject, company, campaign_id) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            rows,
+        )
+
+    def record(self, recipient: Dict, subject: str, campaign_id: Optional[str] = None):
+        """Buffer one sent email; written with the next batch"""
+        email = self._normalize(recipient.get('email'))
+        row = (time.time(), email, self._domain(email), recipient.get('name', '') or '',
+               subject or '', recipient.get('company', '') or '', campaign_id)
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        self._insert(rows)
+        self._conn.commit()
+
+        if self.csv_mirror:
+            try:
+                self._append_csv(self.csv_path, rows)
+            except OSError as e:
+                self.logger.warning(f"Failed to mirror sent emails to {self.csv_path}: {e}")
+
+    @staticmethod
+    def _append_csv(path: Path, rows: Iterable[tuple]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_exists = path.exists()
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(CSV_FIELDS)
+            for timestamp, email, _, name, subject, company, _ in rows:
+                writer.writerow([datetime.fromtimestamp(timestamp).isoformat(), email, name, subject, company])
+
+    def contacted_emails(self, emails: Iterable[str], days: float) -> Set[str]:
+        """The given emails (lower-cased) that were sent to within the last ``days``"""
+        wanted_set = {self._normalize(email) for email in emails if email}
+        wanted = list(wanted_set)
+        cutoff = time.time() - days * DAY
+        with self._lock:
+            found = {row[1] for row in self._buffer if row[0] >= cutoff and row[1] in wanted_set}
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                rows = self._conn.execute(
+                    f'SELECT DISTINCT email FROM sent WHERE email IN ({",".join("?" * len(chunk))}) '
+                    'AND timestamp >= ?',
+                    (*chunk, cutoff),
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def contacted_within(self, email: str, days: float) -> bool:
+        return bool(self.contacted_emails([email], days))
+
+    def domain_count(self, domain: str, days: float) -> int:
+        """Emails sent to a domain within the last ``days``"""
+        domain = domain.strip().lower()
+        cutoff = time.time() - days * DAY
+        with self._lock:
+            buffered = sum(1 for row in self._buffer if row[2] == domain and row[0] >= cutoff)
+            (count,) = self._conn.execute(
+                'SELECT COUNT(*) FROM sent WHERE domain = ? AND timestamp >= ?', (domain, cutoff)
+            ).fetchone()
+        return count + buffered
+
+    def timestamps_since(self, seconds: float) -> List[float]:
+        """Send times within the last ``seconds``, oldest first"""
+        cutoff = time.time() - seconds
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp FROM sent WHERE timestamp >= ? ORDER BY timestamp', (cutoff,)
+            ).fetchall()
+            buffered = [row[0] for row in self._buffer if row[0] >= cutoff]
+        return [row[0] for row in rows] + buffered
+
+    def entries(self, days: Optional[float] = None) -> List[Dict]:
+        """Sent emails as rows in the sent_emails.csv format, optionally only recent ones"""
+        self.flush()
+        cutoff = time.time() - days * DAY if days is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp, email, name, subject, company FROM sent '
+                'WHERE timestamp >= ? ORDER BY timestamp',
+                (cutoff,),
+            ).fetchall()
+        return [
+            dict(zip(CSV_FIELDS, (datetime.fromtimestamp(row[0]).isoformat(), *row[1:])))
+            for row in rows
+        ]
+
+    def export_csv(self, path: Path) -> int:
+        """Write the full history to a CSV in the sent_emails.csv format"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp, email, domain, name, subject, company, campaign_id FROM sent ORDER BY timestamp'
+            ).fetchall()
+        path = Path(path)
+        if path.exists():
+            path.unlink()
+        self._append_csv(path, rows)
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, int]:
+        cutoff = time.time() - DAY
+        with self._lock:
+            (total,) = self._conn.execute('SELECT COUNT(*) FROM sent').fetchone()
+            (today,) = self._conn.execute('SELECT COUNT(*) FROM sent WHERE timestamp >= ?', (cutoff,)).fetchone()
+            buffered = len(self._buffer)
+        return {
+            'total': total + buffered,
+            'last_day': today + buffered
+        }
+
+    def close(self):
+        """Write buffered sends and close the SQLite connection"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
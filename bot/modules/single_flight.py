@@ -0,0 +1,89 @@
+"""
+Single Flight
+Coalesces identical concurrent or back-to-back calls into one execution
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    """Share one execution among callers that ask for the same key.
+
+    Callers arriving while a call is running wait for it and receive its
+    result or exception. Successful results are also reused by callers
+    arriving within ``window_seconds`` after the call finished.
+    """
+
+    def __init__(self, window_seconds: float = 0.0, max_entries: int = 1000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0
+        }
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def _prune(self, now: float):
+        expired = [
+            key for key, call in self._calls.items()
+            if call.done.is_set() and (call.error is not None or now - call.finished_at > self.window_seconds)
+        ]
+        for key in expired:
+            del self._calls[key]
+
+        # Drop the oldest finished results if the window keeps too many
+        overflow = len(self._calls) - self.max_entries
+        if overflow > 0:
+            finished = sorted(
+                (call.finished_at, key) for key, call in self._calls.items() if call.done.is_set()
+            )
+            for _, key in finished[:overflow]:
+                del self._calls[key]
+
+    def do(self, key: Hashable, func: Callable):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['executed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            call.done.set()
+            if call.error is not None or not self.window_seconds:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+
+        return call.result
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,153 @@
+"""
+SMTP Session
+Reuses one authenticated SMTP connection across sends and reconnects when it drops
+"""
+
+import logging
+import smtplib
+import time
+from email.message import Message
+from typing import Dict, Optional
+
+
+class SMTPSession:
+    """Lazily connected SMTP session shared by a run of sends.
+
+    The connection is opened on the first send. Before a send after more
+    than ``noop_after_idle_seconds`` of idle time a NOOP checks that the
+    server still holds the connection. A dropped connection is reopened
+    transparently, and a fresh one is started after
+    ``max_messages_per_connection`` messages.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, config: Optional[Dict] = None):
+        config = config or {}
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = float(config.get('timeout', 30))
+        self.max_messages_per_connection = int(config.get('max_messages_per_connection', 50))
+        self.noop_after_idle_seconds = float(config.get('noop_after_idle_seconds', 30))
+        self.max_reconnects = int(config.get('max_reconnects', 2))
+        self.use_starttls = bool(config.get('starttls', True))
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'connections': 0,
+            'reconnects': 0,
+            'noops': 0,
+            'messages': 0
+        }
+
+        self._server: Optional[smtplib.SMTP] = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new connection, replacing any existing one"""
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._quit(server)
+            raise
+
+        self._server = server
+        self._sent_on_connection = 0
+        self._last_used = time.monotonic()
+        self.stats['connections'] += 1
+        self.logger.info(f"Connected to SMTP server {self.host}:{self.port}")
+        return server
+
+    def keep_alive(self) -> bool:
+        """Send a NOOP if the connection has been idle; False if it has gone away"""
+        if self._server is None:
+            return False
+        if time.monotonic() - self._last_used < self.noop_after_idle_seconds:
+            return True
+
+        try:
+            code, _ = self._server.noop()
+        except (smtplib.SMTPServerDisconnected, OSError):
+            code = None
+        self.stats['noops'] += 1
+
+        if code != 250:
+            self.logger.info("SMTP connection went idle and was dropped by the server")
+            self._discard()
+            return False
+
+        self._last_used = time.monotonic()
+        return True
+
+    def _ensure_connected(self) -> smtplib.SMTP:
+        if self._server is not None and self._sent_on_connection >= self.max_messages_per_connection:
+            self.logger.info(f"Recycling SMTP connection after {self._sent_on_connection} messages")
+            self.close()
+        if self._server is not None:
+            self.keep_alive()
+        if self._server is None:
+            self.connect()
+        return self._server
+
+    def send_message(self, msg: Message):
+        """Send a message, reconnecting if the server dropped the connection"""
+        attempts = 0
+        while True:
+            server = self._ensure_connected()
+            try:
+                result = server.send_message(msg)
+            except smtplib.SMTPServerDisconnected as e:
+                self._discard()
+                if attempts >= self.max_reconnects:
+                    raise
+                attempts += 1
+                self.stats['reconnects'] += 1
+                self.logger.warning(f"SMTP connection lost ({e}), reconnecting ({attempts}/{self.max_reconnects})")
+                continue
+
+            self._sent_on_connection += 1
+            self._last_used = time.monotonic()
+            self.stats['messages'] += 1
+            return result
+
+    def _discard(self):
+        """Forget a broken connection without talking to the server"""
+        if self._server is not None:
+            try:
+                self._server.close()
+            except Exception:
+                pass
+        self._server = None
+
+    def _quit(self, server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """Quit the current connection, if any"""
+        if self._server is not None:
+            self._quit(self._server)
+            self._server = None
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
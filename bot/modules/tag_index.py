@@ -0,0 +1,266 @@
+"""
+Tag Index
+Inverted tag -> recipient bitmap index and boolean tag queries
+"""
+
+import re
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .recipient import TAGS, parse_tags
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(&&?|\|\|?|!|-)|"([^"]*)"|([^\s()&|!"-][^\s()&|!"]*))')
+_OPERATORS = {'&': 'and', '&&': 'and', '|': 'or', '||': 'or', '!': 'not', '-': 'not'}
+_KEYWORDS = ('and', 'or', 'not')
+
+Node = Tuple
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Unexpected character in tag expression at {position}: {text[position:]!r}")
+        position = match.end()
+        opening, closing, operator, quoted, word = match.groups()
+        if opening:
+            tokens.append(('(', opening))
+        elif closing:
+            tokens.append((')', closing))
+        elif operator:
+            tokens.append(('op', _OPERATORS[operator]))
+        elif quoted is not None:
+            tokens.append(('tag', quoted))
+        elif word.lower() in _KEYWORDS:
+            tokens.append(('op', word.lower()))
+        else:
+            tokens.append(('tag', word))
+    return tokens
+
+
+def parse_tag_expression(text: str) -> Node:
+    """Parse a boolean tag expression into a tree of tuples.
+
+    Tags are bare words or "quoted phrases" (needed for spaces or a tag
+    spelled like an operator), combined with ``and``/``&``, ``or``/``|``,
+    ``not``/``!``/``-`` and parentheses. Adjacent terms are ANDed, so
+    ``python -intern`` means python and not intern. Raises ValueError on
+    malformed input.
+    """
+    tokens = _tokenize(text)
+    position = 0
+
+    def peek() -> Optional[Tuple[str, str]]:
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or() -> Node:
+        nonlocal position
+        node = parse_and()
+        while peek() == ('op', 'or'):
+            position += 1
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and() -> Node:
+        nonlocal position
+        node = parse_not()
+        while True:
+            token = peek()
+            if token == ('op', 'and'):
+                position += 1
+            elif token is None or token[0] == ')' or token == ('op', 'or'):
+                return node
+            node = ('and', node, parse_not())
+
+    def parse_not() -> Node:
+        nonlocal position
+        token = peek()
+        if token == ('op', 'not'):
+            position += 1
+            return ('not', parse_not())
+        if token is None:
+            raise ValueError("Tag expression ended unexpectedly")
+        position += 1
+        if token[0] == 'tag':
+            return ('tag', token[1].strip().lower())
+        if token[0] == '(':
+            node = parse_or()
+            if peek() != (')', ')'):
+                raise ValueError("Missing ')' in tag expression")
+            position += 1
+            return node
+        raise ValueError(f"Unexpected {token[1]!r} in tag expression")
+
+    if not tokens:
+        raise ValueError("Empty tag expression")
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position][1]!r} in tag expression")
+    return node
+
+
+def _recipient_tag_ids(recipient: Mapping) -> Tuple[int, ...]:
+    tag_ids = getattr(recipient, 'tag_ids', None)
+    if tag_ids:
+        return tag_ids
+    return parse_tags(recipient.get('tags') or recipient.get('matched_tags') or '')
+
+
+class TagQuery:
+    """A recipient tag filter: target tags (any/all), exclusions and an expression"""
+
+    def __init__(self, node: Node):
+        self.node = node
+        self._lower: Dict[int, str] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['TagQuery']:
+        """Query for the gmail tag settings, or None when every recipient matches"""
+        nodes = []
+
+        mode = str(config.get('tag_match_mode', 'any')).lower()
+        target_tags = [tag.lower() for tag in _tag_list(config.get('target_tags', []))]
+        if target_tags and mode != 'keywords':
+            joiner = 'and' if mode == 'all' else 'or'
+            nodes.append(_combine(joiner, [('tag', tag) for tag in target_tags]))
+
+        exclude_tags = [tag.lower() for tag in _tag_list(config.get('exclude_tags', []))]
+        if exclude_tags:
+            nodes.append(('not', _combine('or', [('tag', tag) for tag in exclude_tags])))
+
+        expression = str(config.get('tag_expression', '') or '').strip()
+        if expression:
+            nodes.append(parse_tag_expression(expression))
+
+        if not nodes:
+            return None
+        return cls(_combine('and', nodes))
+
+    def evaluate(self, lookup: Callable[[str], int], universe: int) -> int:
+        """Bitmap of matches given each tag's bitmap and the bitmap of all recipients"""
+
+        def visit(node: Node) -> int:
+            kind = node[0]
+            if kind == 'tag':
+                return lookup(node[1])
+            if kind == 'not':
+                return universe & ~visit(node[1])
+            if kind == 'and':
+                return visit(node[1]) & visit(node[2])
+            return visit(node[1]) | visit(node[2])
+
+        return visit(self.node)
+
+    def matches(self, recipient: Mapping) -> bool:
+        """Match one recipient by treating it as a one-bit index"""
+        tags = set()
+        for tag_id in _recipient_tag_ids(recipient):
+            tag = self._lower.get(tag_id)
+            if tag is None:
+                tag = self._lower[tag_id] = TAGS.name(tag_id).lower()
+            tags.add(tag)
+        return bool(self.evaluate(lambda tag: 1 if tag in tags else 0, 1))
+
+
+def _tag_list(tags: object) -> List[str]:
+    return [TAGS.name(tag_id) for tag_id in parse_tags(tags)]
+
+
+def _combine(joiner: str, nodes: List[Node]) -> Node:
+    node = nodes[0]
+    for other in nodes[1:]:
+        node = (joiner, node, other)
+    return node
+
+
+class TagIndex:
+    """Inverted index from lower-cased tag to a bitmap of recipient positions.
+
+    Bitmaps are Python ints with bit ``i`` set for the i-th recipient, so
+    ``any``/``all`` targeting and boolean expressions become OR/AND/NOT over
+    a handful of integers regardless of how many recipients are indexed.
+    Positions are collected per tag while adding and each bitmap is built
+    in one pass the first time it is queried.
+    """
+
+    def __init__(self, recipients: Iterable[Mapping] = ()):
+        self.recipients: List[Mapping] = []
+        self._positions: Dict[str, array] = {}
+        self._bitmaps: Dict[str, int] = {}
+        self._lower: Dict[int, str] = {}
+        for recipient in recipients:
+            self.add(recipient)
+
+    def add(self, recipient: Mapping) -> int:
+        """Index a recipient and return its position"""
+        position = len(self.recipients)
+        self.recipients.append(recipient)
+        for tag_id in _recipient_tag_ids(recipient):
+            tag = self._lower.get(tag_id)
+            if tag is None:
+                tag = self._lower[tag_id] = TAGS.name(tag_id).lower()
+            positions = self._positions.get(tag)
+            if positions is None:
+                positions = self._positions[tag] = array('L')
+            elif positions[-1] == position:
+                continue  # same tag in another case
+            positions.append(position)
+            self._bitmaps.pop(tag, None)
+        return position
+
+    @property
+    def universe(self) -> int:
+        return (1 << len(self.recipients)) - 1
+
+    def bitmap(self, tag: str) -> int:
+        tag = tag.strip().lower()
+        bitmap = self._bitmaps.get(tag)
+        if bitmap is None:
+            bits = bytearray((len(self.recipients) + 7) // 8)
+            for position in self._positions.get(tag, ()):
+                bits[position >> 3] |= 1 << (position & 7)
+            bitmap = self._bitmaps[tag] = int.from_bytes(bits, 'little')
+        return bitmap
+
+    def query(self, query: TagQuery) -> int:
+        return query.evaluate(self.bitmap, self.universe)
+
+    def match_any(self, tags: Iterable[str]) -> int:
+        result = 0
+        for tag in tags:
+            result |= self.bitmap(tag)
+        return result
+
+    def match_all(self, tags: Iterable[str]) -> int:
+        result = self.universe
+        for tag in tags:
+            result &= self.bitmap(tag)
+        return result
+
+    @staticmethod
+    def positions(bitmap: int) -> Iterator[int]:
+        """Set bit positions in ascending order"""
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+        for index, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                yield (index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def select(self, bitmap: int) -> List[Mapping]:
+        """Recipients for a bitmap, in load order"""
+        return [self.recipients[position] for position in self.positions(bitmap)]
+
+    def filter(self, query: Optional[TagQuery]) -> List[Mapping]:
+        if query is None:
+            return list(self.recipients)
+        return self.select(self.query(query))
+
+    def tag_counts(self) -> Dict[str, int]:
+        return {tag: len(positions) for tag, positions in self._positions.items()}
+
+    def __len__(self) -> int:
+        return len(self.recipients)
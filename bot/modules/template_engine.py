@@ -0,0 +1,83 @@
+"""
+Message Template Engine
+Compiles message templates once and fills known placeholders locally
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+
+# {name} placeholders; {{ and }} are literal braces
+_TOKEN_PATTERN = re.compile(r'\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}')
+# [[ ... ]] marks a section the AI should rewrite
+_AI_SECTION_PATTERN = re.compile(r'\[\[(.+?)\]\]', re.DOTALL)
+
+_TEXT = 0
+_SLOT = 1
+
+
+class CompiledTemplate:
+    """A template parsed into literal text and placeholder segments.
+
+    Text inside ``[[ ]]`` is kept (with its markers) for the AI to rewrite;
+    placeholders inside it are still filled locally.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self.has_ai_sections = bool(_AI_SECTION_PATTERN.search(template))
+        self.segments: List[Tuple[int, str]] = []
+        self.slots: Set[str] = set()
+
+        position = 0
+        for match in _TOKEN_PATTERN.finditer(template):
+            if match.start() > position:
+                self.segments.append((_TEXT, template[position:match.start()]))
+
+            token = match.group(0)
+            if token == '{{':
+                self.segments.append((_TEXT, '{'))
+            elif token == '}}':
+                self.segments.append((_TEXT, '}'))
+            else:
+                name = match.group(1)
+                self.slots.add(name)
+                self.segments.append((_SLOT, name))
+            position = match.end()
+
+        if position < len(template):
+            self.segments.append((_TEXT, template[position:]))
+
+    def render(self, variables: Dict) -> Tuple[str, Set[str]]:
+        """Fill placeholders, returning the text and any slots left unresolved.
+
+        Unresolved slots (missing or None values) stay in the text as
+        ``{name}`` so a later AI pass can see them.
+        """
+        parts = []
+        unresolved: Set[str] = set()
+        for kind, value in self.segments:
+            if kind == _TEXT:
+                parts.append(value)
+                continue
+
+            filled = variables.get(value)
+            if filled is None:
+                unresolved.add(value)
+                parts.append(f"{{{value}}}")
+            else:
+                parts.append(str(filled))
+
+        return ''.join(parts), unresolved
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template, reusing the parsed form for repeated templates"""
+    return CompiledTemplate(template)
+
+
+def render_template(template: str, variables: Dict) -> str:
+    """Fill known placeholders locally; AI sections are unwrapped as written"""
+    text, _ = compile_template(template).render(variables)
+    return _AI_SECTION_PATTERN.sub(lambda match: match.group(1), text)
@@ -0,0 +1,179 @@
+"""
+Tests for SMTPSession against a local stand-in SMTP server
+Run from the bot directory: python -m unittest discover tests
+"""
+
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+import unittest
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.smtp_session import SMTPSession  # noqa: E402
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH, NOOP, MAIL, RCPT, DATA and QUIT"""
+
+    def reply(self, line: str):
+        self.wfile.write((line + '\r\n').encode())
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost test server')
+        delivered = 0
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-localhost')
+                self.reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                self.reply('235 Authentication successful')
+            elif command.startswith('NOOP'):
+                with server.lock:
+                    server.noops += 1
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                delivered += 1
+                with server.lock:
+                    server.messages += 1
+                self.reply('250 Queued')
+                if server.drop_after and delivered >= server.drop_after:
+                    return  # hang up without QUIT, like a server timing us out
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, drop_after: int = 0):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.drop_after = drop_after
+        self.connections = 0
+        self.noops = 0
+        self.messages = 0
+
+
+class SMTPSessionTest(unittest.TestCase):
+    def start_server(self, drop_after: int = 0) -> _SMTPServer:
+        server = _SMTPServer(drop_after)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def make_session(self, server: _SMTPServer, **config) -> SMTPSession:
+        config.setdefault('starttls', False)
+        session = SMTPSession('127.0.0.1', server.server_address[1], 'user', 'secret', config)
+        self.addCleanup(session.close)
+        return session
+
+    @staticmethod
+    def message(index: int = 0) -> EmailMessage:
+        msg = EmailMessage()
+        msg['From'] = 'me@example.com'
+        msg['To'] = f'recipient{index}@example.com'
+        msg['Subject'] = f'Hello {index}'
+        msg.set_content('Body')
+        return msg
+
+    def test_connects_lazily_on_first_send(self):
+        server = self.start_server()
+        session = self.make_session(server)
+
+        self.assertFalse(session.connected)
+        self.assertFalse(session.keep_alive())
+        self.assertEqual(server.connections, 0)
+
+        session.send_message(self.message())
+        session.send_message(self.message(1))
+
+        self.assertTrue(session.connected)
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(server.messages, 2)
+        self.assertEqual(session.get_stats()['connections'], 1)
+
+    def test_sends_noop_after_idle(self):
+        server = self.start_server()
+        session = self.make_session(server, noop_after_idle_seconds=0.05)
+
+        session.send_message(self.message())
+        self.assertTrue(session.keep_alive())
+        self.assertEqual(server.noops, 0)
+
+        time.sleep(0.1)
+        session.send_message(self.message(1))
+
+        self.assertEqual(server.noops, 1)
+        self.assertEqual(session.get_stats()['noops'], 1)
+        self.assertEqual(server.connections, 1)
+
+    def test_recycles_connection_after_max_messages(self):
+        server = self.start_server()
+        session = self.make_session(server, max_messages_per_connection=2)
+
+        for index in range(5):
+            session.send_message(self.message(index))
+
+        self.assertEqual(server.messages, 5)
+        self.assertEqual(server.connections, 3)
+        self.assertEqual(session.get_stats()['reconnects'], 0)
+
+    def test_reconnects_after_server_drops_connection(self):
+        server = self.start_server(drop_after=1)
+        session = self.make_session(server)
+
+        session.send_message(self.message())
+        session.send_message(self.message(1))
+        session.send_message(self.message(2))
+
+        self.assertEqual(server.messages, 3)
+        self.assertEqual(server.connections, 3)
+        self.assertEqual(session.get_stats()['reconnects'], 2)
+
+    def test_idle_noop_detects_dropped_connection(self):
+        server = self.start_server(drop_after=1)
+        session = self.make_session(server, noop_after_idle_seconds=0)
+
+        session.send_message(self.message())
+        self.assertFalse(session.keep_alive())
+        self.assertFalse(session.connected)
+
+        session.send_message(self.message(1))
+        self.assertEqual(server.messages, 2)
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(session.get_stats()['reconnects'], 0)
+
+    def test_gives_up_after_max_reconnects(self):
+        server = self.start_server(drop_after=1)
+        session = self.make_session(server, max_reconnects=0)
+
+        session.send_message(self.message())
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            session.send_message(self.message(1))
+
+
+if __name__ == '__main__':
+    unittest.main()